@@ -0,0 +1,188 @@
+# Train the controller with several processes: the actors move the robots of their own BatchArena with a
+# copy of the Network and send the transitions to the learner, which only fills the replay memory and runs
+# Dqn.learn on large batches. The learner publishes its weights in a shared Network every few learning
+# steps and the actors copy them every few steps.
+
+import argparse
+import os
+import queue
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from arena import BatchArena, load_data
+from dqn import Dqn
+from metrics import MetricsWriter
+from network import Network
+from policy import Policy
+
+
+def actor(list_actions, n_robots, shared_model, lock, version, transitions, stop, seed, temperature, sync_interval,
+          chunk_size):
+    # One thread by process, the CPU is shared by the actors and the learner
+    torch.set_num_threads(1)
+    torch.manual_seed(seed)
+    arena = BatchArena(list_actions, n_robots, seed=seed)
+    model = Network(shared_model.input_size, shared_model.nb_action)
+    policy = Policy(model, temperature)
+    model_version = -1
+
+    states = arena.reset()
+    chunk = []
+    step = 0
+    while not stop.is_set():
+        if step % sync_interval == 0 and version.value != model_version:
+            with lock:
+                model.load_state_dict(shared_model.state_dict())
+                model_version = version.value
+
+        actions = policy.sample(states).numpy()
+        next_states, rewards, reached = arena.step(actions)
+        goals = [(arena.last_steps[i], arena.last_seq_change[i]) for i in np.flatnonzero(reached)]
+        chunk.append((states, next_states, actions, rewards, goals))
+        states = next_states
+        step += 1
+
+        # The transitions are sent by chunks of chunk_size steps, the put waits when the learner is late
+        if len(chunk) == chunk_size:
+            batch = [np.concatenate(values) for values in list(zip(*chunk))[:4]]
+            batch.append([goal for _, _, _, _, step_goals in chunk for goal in step_goals])
+            chunk = []
+            while not stop.is_set():
+                try:
+                    transitions.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+
+def receive(model, transitions, metrics, timeout, max_chunks):
+    # Add the chunks waiting in the queue (at most max_chunks) to the replay memory, returns the number of
+    # transitions
+    n = 0
+    try:
+        for i in range(max_chunks):
+            states, next_states, actions, rewards, goals = \
+                transitions.get(timeout=timeout) if i == 0 else transitions.get_nowait()
+            model.memory.push_batch(
+                torch.as_tensor(states, dtype=torch.float32), torch.as_tensor(next_states, dtype=torch.float32),
+                torch.as_tensor(actions), torch.as_tensor(rewards, dtype=torch.float32)
+            )
+            model.reward_window.extend(rewards)
+            if metrics is not None:
+                for steps, seq_change in goals:
+                    metrics.goal(steps, seq_change)
+            n += len(actions)
+    except queue.Empty:
+        pass
+    return n
+
+
+def learner(model, shared_model, lock, version, transitions, n_updates, batch_size, publish_interval,
+            metrics=None, log_interval=1000, max_chunks=64):
+    start_time = time.time()
+    n_transitions = 0
+    updates = 0
+    while updates < n_updates:
+        timeout = 0.1 if len(model.memory) <= batch_size else 0
+        n_transitions += receive(model, transitions, metrics, timeout, max_chunks)
+        if len(model.memory) <= batch_size:
+            continue
+
+        model.replay(batch_size)
+        updates += 1
+        if model.checkpointer is not None:
+            model.checkpointer.step()
+        if updates % publish_interval == 0:
+            with lock:
+                shared_model.load_state_dict(model.model.state_dict())
+                version.value += 1
+        if updates % log_interval == 0:
+            elapsed = time.time() - start_time
+            print(f'Update {updates} : score {model.score():.2f}, {n_transitions / elapsed:.0f} transitions/s, '
+                  f'{updates / elapsed:.0f} updates/s')
+    return n_transitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the controller with actor processes and one learner')
+    parser.add_argument('--actors', type=int, default=max(1, os.cpu_count() - 1), help='Number of actor processes')
+    parser.add_argument('--robots', type=int, default=64, help='Number of robots of each actor')
+    parser.add_argument('--updates', type=int, default=20000, help='Number of learning steps')
+    parser.add_argument('--batch-size', type=int, default=1024, help='Size of the learning batches')
+    parser.add_argument('--publish-interval', type=int, default=10,
+                        help='Number of learning steps between two publications of the weights')
+    parser.add_argument('--sync-interval', type=int, default=10,
+                        help='Number of actor steps between two copies of the published weights')
+    parser.add_argument('--chunk-size', type=int, default=8, help='Number of actor steps sent together')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generators')
+    parser.add_argument('--prioritized', action='store_true', help='Use the prioritized replay memory')
+    parser.add_argument('--load', action='store_true', help='Start from last_model.pth')
+    parser.add_argument('--autosave', type=int, default=1000,
+                        help='Number of learning steps between two background saves in checkpoints/ (0 to disable)')
+    parser.add_argument('--no-save', action='store_true', help='Do not save last_model.pth at the end')
+    parser.add_argument('--no-metrics', action='store_true', help='Do not write perf.csv and perf.png')
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    list_actions = load_data()
+    print(f'Number of actions : {len(list_actions)}')
+    model = Dqn(8, len(list_actions), 0.9, prioritized=args.prioritized)
+    if args.load:
+        model.load()
+    if args.autosave > 0:
+        # The steps of the checkpointer are learning steps here
+        model.autosave(args.autosave)
+    metrics = None if args.no_metrics else MetricsWriter()
+
+    # Processes started with spawn (no copy of the threads of the learner), the shared Network is in shared memory
+    ctx = mp.get_context('spawn')
+    shared_model = Network(8, len(list_actions))
+    shared_model.load_state_dict(model.model.state_dict())
+    shared_model.share_memory()
+    lock = ctx.Lock()
+    version = ctx.Value('i', 0)
+    transitions = ctx.Queue(maxsize=4 * args.actors)
+    stop = ctx.Event()
+    actors = [
+        ctx.Process(target=actor, args=(
+            list_actions, args.robots, shared_model, lock, version, transitions, stop, args.seed + 1 + i,
+            model.temperature, args.sync_interval, args.chunk_size
+        ), daemon=True)
+        for i in range(args.actors)
+    ]
+    for process in actors:
+        process.start()
+
+    start_time = time.time()
+    try:
+        n_transitions = learner(
+            model, shared_model, lock, version, transitions, args.updates, args.batch_size, args.publish_interval,
+            metrics
+        )
+    finally:
+        stop.set()
+        # The actors can only exit once their last put is not blocked anymore
+        while any(process.is_alive() for process in actors):
+            try:
+                transitions.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for process in actors:
+            process.join()
+    print(f'Training time [{args.actors} actors, {args.updates} updates, {n_transitions} transitions] : '
+          f'{(time.time() - start_time):.2f}s')
+
+    if metrics is not None:
+        metrics.close()
+    if model.checkpointer is not None:
+        model.checkpointer.close()
+    if not args.no_save:
+        model.save()
+        print("Saved model")
+
+
+if __name__ == '__main__':
+    main()
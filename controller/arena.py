@@ -0,0 +1,264 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Same arena as the Kivy Game (controller_widgets.Robot.move and Game.update) without any widget,
+# positions in pixels and angles in degrees
+ROBOT_SIZE = 20
+WALL_MARGIN = 10
+WALL_REWARD = -50
+GOAL_RADIUS = 50
+GOAL_START = 150
+MAX_GOALS = 50000
+
+# Sensors of Robot.move (x in the robot reference frame, angle offset), 3 at the front and 3 at the back
+SENSORS = [(30, 0), (30, 30), (30, -30), (-30, 0), (-30, -30), (-30, 30)]
+
+
+def load_data():
+    df = pd.read_pickle(f'{Path(__file__).resolve().parent}/_all_sequences.pkl')
+    # round close to zero values to zero
+    df['x'] = df['x'].where(abs(df['x']) > 1e-2, 0)
+    df['y'] = df['y'].where(abs(df['y']) > 1e-3, 0)
+    df['yaw'] = df['yaw'].where(abs(df['yaw']) > 1e-2, 0)
+
+    # Remove duplicates
+    df = df.drop_duplicates(subset=['x', 'y', 'yaw'])
+
+    # Rescale
+    df['yaw'] = np.degrees(df['yaw'])
+    df['x'] = np.multiply(df['x'], 100)
+    df['y'] = np.multiply(df['y'], 100)
+
+    # Separate the actuation phase between 0 and 180 and keep only reverse to false (remove symmetry)
+    df = df[df["actuation"] == 0]
+    df = df[~df['reverse']]
+    # df = df[~df['reverse']]
+    return df.values.tolist()
+
+
+# Vector(x, y).rotate(angle) of Kivy, works on numbers and on numpy arrays
+def rotate(x, y, angle):
+    angle = np.radians(angle)
+    return x * np.cos(angle) - y * np.sin(angle), y * np.cos(angle) + x * np.sin(angle)
+
+
+# Vector(x1, y1).angle((x2, y2)) of Kivy, in degrees
+def angle_between(x1, y1, x2, y2):
+    return -(180 / np.pi) * np.arctan2(x1 * y2 - y1 * x2, x1 * x2 + y1 * y2)
+
+
+# Robot.sensor_value, 1 when the sensor is closer than WALL_MARGIN to a wall
+def sensor_value(x, y, width, height):
+    return ((x > width - WALL_MARGIN) | (x < WALL_MARGIN) | (y > height - WALL_MARGIN) | (y < WALL_MARGIN)) * 1.
+
+
+class Arena(object):
+    def __init__(self, actions, width=1280, height=720, seed=None):
+        self.actions = actions
+        self.width = width
+        self.height = height
+        # Only used for the random goals after MAX_GOALS goals
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        # Robot at the center (x, y is the corner of the robot like the position of the widget)
+        self.x = self.width / 2 - ROBOT_SIZE / 2
+        self.y = self.height / 2 - ROBOT_SIZE / 2
+        self.angle = 0.
+        self.sensors = [(self.x, self.y)] * len(SENSORS)
+        self.signals = [0.] * len(SENSORS)
+        self.goal_x = GOAL_START
+        self.goal_y = self.height - GOAL_START
+
+        self.goal_reached_nb = 0
+        self.steps = 0
+        self.last_steps = 0
+        self.seq_change = 0
+        self.last_seq_change = 0
+        self.wall_hits = 0
+        self.last_action = 0
+        self.last_distance = 0
+        self.orientation = self.goal_orientation()
+        self.last_orientation = 0
+        return self.state()
+
+    def goal_orientation(self):
+        velocity = rotate(1, 0, self.angle)
+        return float(angle_between(*velocity, self.goal_x - self.x, self.goal_y - self.y)) / 180.
+
+    def state(self):
+        return self.signals + [self.orientation, -self.orientation]
+
+    def move(self, displacement):
+        dx, dy = rotate(displacement[3], displacement[4], self.angle)
+        self.x += dx
+        self.y += dy
+        self.angle += displacement[5]
+
+        self.sensors = []
+        for sensor_x, sensor_angle in SENSORS:
+            x, y = rotate(sensor_x, 0, (self.angle + sensor_angle) % 360)
+            self.sensors.append((x + self.x, y + self.y))
+        self.signals = [float(sensor_value(x, y, self.width, self.height)) for x, y in self.sensors]
+
+    def step(self, action):
+        action = int(action)
+        self.move(self.actions[action])
+        distance = float(np.sqrt((self.x - self.goal_x)**2 + (self.y - self.goal_y)**2))
+        self.steps += 1
+
+        reward = (self.last_distance - distance) / 6
+        # score based also on orientation
+        if abs(self.last_orientation) < abs(self.orientation):
+            reward -= 0.2
+        elif abs(self.last_orientation) > abs(self.orientation):
+            reward += 0.2
+        # Score also based on sequence change
+        if self.actions[self.last_action][0] == self.actions[action][0]:
+            reward += 0.02
+        else:
+            self.seq_change += 1
+        self.last_action = action
+
+        # Too close to the edges of the wall
+        x = min(max(self.x, WALL_MARGIN), self.width - WALL_MARGIN)
+        y = min(max(self.y, WALL_MARGIN), self.height - WALL_MARGIN)
+        if x != self.x or y != self.y:
+            self.x, self.y = x, y
+            reward = WALL_REWARD
+            self.wall_hits += 1
+
+        reached = distance < GOAL_RADIUS
+        if reached:
+            self.goal_reached_nb += 1
+            if self.goal_reached_nb <= MAX_GOALS:
+                self.goal_x = self.width - self.goal_x
+                self.goal_y = self.height - self.goal_y
+                # reward for reaching the objective faster than last round
+                reward = self.last_steps - self.steps
+            else:
+                self.goal_x = int(self.rng.integers(WALL_MARGIN, self.width - WALL_MARGIN, endpoint=True))
+                self.goal_y = int(self.rng.integers(WALL_MARGIN, self.height - WALL_MARGIN, endpoint=True))
+            self.last_steps = self.steps
+            self.last_seq_change = self.seq_change
+            self.steps = 0
+            self.seq_change = 0
+
+        self.last_distance = distance
+        self.last_orientation = self.orientation
+        self.orientation = self.goal_orientation()
+        return self.state(), reward, reached
+
+
+# Arena of M robots moving at the same time, the state of the robots is stored in arrays and each step is
+# computed for all the robots at once. Every robot has its own goal, with random_goals the goals are drawn
+# at random (instead of all starting in the same corner and flipping), the reward at a goal is the same.
+class BatchArena(object):
+    def __init__(self, actions, n_robots, width=1280, height=720, seed=None, random_goals=True):
+        # Lookup tables of the actions, displacement (x, y, yaw) and index of the sequence
+        self.displacements = np.array([action[3:6] for action in actions], dtype=float)
+        _, self.sequences = np.unique([action[0] for action in actions], return_inverse=True)
+        self.n_robots = n_robots
+        self.width = width
+        self.height = height
+        self.random_goals = random_goals
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        m = self.n_robots
+        self.x = np.full(m, self.width / 2 - ROBOT_SIZE / 2)
+        self.y = np.full(m, self.height / 2 - ROBOT_SIZE / 2)
+        self.angle = np.zeros(m)
+        self.sensors = np.stack((np.repeat(self.x[:, np.newaxis], len(SENSORS), axis=1),
+                                 np.repeat(self.y[:, np.newaxis], len(SENSORS), axis=1)), axis=-1)
+        self.signals = np.zeros((m, len(SENSORS)))
+        if self.random_goals:
+            self.goal_x, self.goal_y = self.random_goal(m)
+        else:
+            self.goal_x = np.full(m, float(GOAL_START))
+            self.goal_y = np.full(m, float(self.height - GOAL_START))
+
+        self.goal_reached_nb = np.zeros(m, dtype=int)
+        self.steps = np.zeros(m, dtype=int)
+        self.last_steps = np.zeros(m, dtype=int)
+        self.seq_change = np.zeros(m, dtype=int)
+        self.last_seq_change = np.zeros(m, dtype=int)
+        self.wall_hits = np.zeros(m, dtype=int)
+        self.last_action = np.zeros(m, dtype=int)
+        self.last_distance = np.zeros(m)
+        self.orientation = self.goal_orientation()
+        self.last_orientation = np.zeros(m)
+        return self.state()
+
+    def random_goal(self, n):
+        goal_x = self.rng.integers(WALL_MARGIN, self.width - WALL_MARGIN, n, endpoint=True).astype(float)
+        goal_y = self.rng.integers(WALL_MARGIN, self.height - WALL_MARGIN, n, endpoint=True).astype(float)
+        return goal_x, goal_y
+
+    def goal_orientation(self):
+        velocity = rotate(1, 0, self.angle)
+        return angle_between(*velocity, self.goal_x - self.x, self.goal_y - self.y) / 180.
+
+    def state(self):
+        # (M, 8) the 6 signals and the orientation of each robot
+        return np.column_stack((self.signals, self.orientation, -self.orientation))
+
+    def move(self, displacements):
+        dx, dy = rotate(displacements[:, 0], displacements[:, 1], self.angle)
+        self.x += dx
+        self.y += dy
+        self.angle += displacements[:, 2]
+
+        sensor_x, sensor_angle = np.array(SENSORS, dtype=float).T
+        x, y = rotate(sensor_x, 0, (self.angle[:, np.newaxis] + sensor_angle) % 360)
+        self.sensors = np.stack((x + self.x[:, np.newaxis], y + self.y[:, np.newaxis]), axis=-1)
+        self.signals = sensor_value(self.sensors[..., 0], self.sensors[..., 1], self.width, self.height)
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=int)
+        self.move(self.displacements[actions])
+        distance = np.sqrt((self.x - self.goal_x)**2 + (self.y - self.goal_y)**2)
+        self.steps += 1
+
+        rewards = (self.last_distance - distance) / 6
+        # score based also on orientation
+        rewards -= 0.2 * (np.abs(self.last_orientation) < np.abs(self.orientation))
+        rewards += 0.2 * (np.abs(self.last_orientation) > np.abs(self.orientation))
+        # Score also based on sequence change
+        same_sequence = self.sequences[self.last_action] == self.sequences[actions]
+        rewards += 0.02 * same_sequence
+        self.seq_change += ~same_sequence
+        self.last_action = actions
+
+        # Too close to the edges of the wall
+        x = np.clip(self.x, WALL_MARGIN, self.width - WALL_MARGIN)
+        y = np.clip(self.y, WALL_MARGIN, self.height - WALL_MARGIN)
+        walls = (x != self.x) | (y != self.y)
+        self.x, self.y = x, y
+        rewards[walls] = WALL_REWARD
+        self.wall_hits += walls
+
+        reached = distance < GOAL_RADIUS
+        if reached.any():
+            self.goal_reached_nb += reached
+            # reward for reaching the objective faster than last round, whatever the placement of the goals
+            rewarded = reached & (self.goal_reached_nb <= MAX_GOALS)
+            rewards[rewarded] = (self.last_steps - self.steps)[rewarded]
+            flipped = rewarded & (not self.random_goals)
+            self.goal_x[flipped] = self.width - self.goal_x[flipped]
+            self.goal_y[flipped] = self.height - self.goal_y[flipped]
+            drawn = reached & ~flipped
+            self.goal_x[drawn], self.goal_y[drawn] = self.random_goal(drawn.sum())
+            self.last_steps[reached] = self.steps[reached]
+            self.last_seq_change[reached] = self.seq_change[reached]
+            self.steps[reached] = 0
+            self.seq_change[reached] = 0
+
+        self.last_distance = distance
+        self.last_orientation = self.orientation
+        self.orientation = self.goal_orientation()
+        return self.state(), rewards, reached
@@ -0,0 +1,84 @@
+import os
+import queue
+import tempfile
+import threading
+from pathlib import Path
+
+import torch
+
+
+# torch.save next to the final name then rename, a crash during the save never leaves a broken file.
+# The temporary file has a unique name, several threads can save the same path at the same time.
+def save_atomic(obj, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', prefix=f'{path.name}.', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            torch.save(obj, tmp_file)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# Save the Dqn every interval steps without stopping the training: the state is copied on the training
+# thread (Dqn.snapshot) and written by a background thread in folder/model_<step>.pth, only the last keep
+# checkpoints are kept (and the file last, if given, is replaced by the newest one).
+# If the previous snapshot is still waiting to be written when a new one comes, only the new one is written.
+class Checkpointer(object):
+    def __init__(self, model, interval=10000, keep=5, replay=False, folder='checkpoints', last=None):
+        self.model = model
+        self.interval = interval
+        self.keep = keep
+        self.replay = replay
+        self.folder = Path(folder)
+        self.last = last
+        self.steps = 0
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def step(self, n=1):
+        # n steps since the last call, a save each time a multiple of interval is passed
+        previous = self.steps
+        self.steps += n
+        if self.steps // self.interval > previous // self.interval:
+            self.save()
+
+    def save(self):
+        snapshot = self.model.snapshot(self.replay)
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.queue.put((self.steps, snapshot))
+
+    def close(self):
+        # Wait for the last snapshot to be written, the put is retried while the thread is alive so it never
+        # waits for a thread that has stopped
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            steps, snapshot = item
+            # A failed save (disk full, permissions) is only reported, the next snapshots are still written
+            try:
+                save_atomic(snapshot, self.folder / f'model_{steps:09d}.pth')
+                if self.last is not None:
+                    save_atomic(snapshot, self.last)
+                for path in sorted(self.folder.glob('model_*.pth'))[:-self.keep]:
+                    path.unlink()
+            except Exception as error:
+                print(f'Checkpoint of step {steps} not saved : {error}')
@@ -1,72 +1,148 @@
+import copy
 import os
 
+import numpy as np
 import torch
 import torch.nn.functional as F
 import torch.optim as optim
-from torch.autograd import Variable
 
+from checkpoint import Checkpointer, save_atomic
+from metrics import RollingMean
 from network import Network
+from policy import export
+from prioritized_memory import PrioritizedReplayMemory
 from replay_memory import ReplayMemory
 
 
 class Dqn():
-    def __init__(self, input_size, nb_action, gamma):
+    def __init__(self, input_size, nb_action, gamma, prioritized=False, alpha=0.6, beta=0.4, beta_steps=100000):
         self.gamma = gamma
-        self.reward_window = []
+        # Rewards of the last 1000 steps
+        self.reward_window = RollingMean(1000)
         self.model = Network(input_size, nb_action)
-        self.memory = ReplayMemory(100000)
+
+        # Prioritized replay samples the transitions with a large TD error more often, beta (importance
+        # sampling correction) goes linearly from its initial value to 1 in beta_steps learning steps
+        self.prioritized = prioritized
+        if prioritized:
+            self.memory = PrioritizedReplayMemory(100000, input_size, alpha)
+        else:
+            self.memory = ReplayMemory(100000, input_size)
+        self.beta = beta
+        self.beta_increment = (1. - beta) / beta_steps
         self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
         self.last_state = torch.Tensor(input_size).unsqueeze(0)
         self.last_action = 0
         self.last_reward = 0
+        # Last states and actions of the robots of update_batch
+        self.last_states = None
+        self.last_actions = None
+
+        # Background saves, see autosave
+        self.checkpointer = None
 
         # The higher the temperature, the more exploration will happens
         self.temperature = 10
 
     def select_action(self, state):
-        probs = F.softmax(self.model(Variable(state)) * self.temperature)
-        action = probs.multinomial(1)
-        return action.data[0, 0]
+        # One action for each row of the state, (M, input_size) gives M actions
+        with torch.inference_mode():
+            probs = F.softmax(self.model(state) * self.temperature, dim=1)
+            return probs.multinomial(1)[:, 0]
 
-    def learn(self, batch_state, batch_next_state, batch_reward, batch_action):
+    def learn(self, batch_state, batch_next_state, batch_reward, batch_action, weights=None):
         outputs = self.model(batch_state).gather(1, batch_action.unsqueeze(1)).squeeze(1)
         next_outputs = self.model(batch_next_state).detach().max(1)[0]
         target = self.gamma*next_outputs + batch_reward
-        td_loss = F.smooth_l1_loss(outputs, target)
+        if weights is None:
+            td_loss = F.smooth_l1_loss(outputs, target)
+        else:
+            # Loss of each transition weighted by its importance sampling weight
+            td_loss = (weights * F.smooth_l1_loss(outputs, target, reduction='none')).mean()
         self.optimizer.zero_grad()
         td_loss.backward(retain_graph=True)
         self.optimizer.step()
+        # TD errors, the new priorities of the transitions
+        return (target - outputs).detach()
 
     def update(self, reward, new_signal):
+        # reward is the one of the move from last_state to new_state, like the rewards of update_batch
         new_state = torch.Tensor(new_signal).float().unsqueeze(0)
         self.memory.push(
-            (self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([self.last_reward]))
+            (self.last_state, new_state, torch.LongTensor([int(self.last_action)]), torch.Tensor([reward]))
         )
-        action = self.select_action(new_state)
-        if len(self.memory.memory) > 100:
-            batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(100)
-            self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+        action = self.select_action(new_state)[0]
+        self.replay()
         self.last_action = action
         self.last_state = new_state
         self.last_reward = reward
         self.reward_window.append(reward)
-        if len(self.reward_window) > 1000:
-            del self.reward_window[0]
+        if self.checkpointer is not None:
+            self.checkpointer.step()
         return action
 
+    def update_batch(self, rewards, new_signals, batch_size=100):
+        # Same as update for M robots at once, rewards (M,) and new_signals (M, input_size)
+        new_states = torch.as_tensor(np.asarray(new_signals), dtype=torch.float32)
+        if self.last_states is not None:
+            self.memory.push_batch(
+                self.last_states, new_states, self.last_actions, torch.as_tensor(rewards, dtype=torch.float32)
+            )
+        actions = self.select_action(new_states)
+        self.replay(batch_size)
+        self.last_states = new_states
+        self.last_actions = actions
+        self.reward_window.extend(rewards)
+        if self.checkpointer is not None:
+            self.checkpointer.step()
+        return actions
+
+    def replay(self, batch_size=100):
+        # One learning step on a batch of the memory
+        if len(self.memory) <= batch_size:
+            return
+        if self.prioritized:
+            batch_state, batch_next_state, batch_action, batch_reward, indices, weights = \
+                self.memory.sample(batch_size, self.beta)
+            td_errors = self.learn(batch_state, batch_next_state, batch_reward, batch_action, weights)
+            self.memory.update_priorities(indices, td_errors.numpy())
+            self.beta = min(1., self.beta + self.beta_increment)
+        else:
+            batch_state, batch_next_state, batch_action, batch_reward = self.memory.sample(batch_size)
+            self.learn(batch_state, batch_next_state, batch_reward, batch_action)
+
     def score(self):
-        return sum(self.reward_window)/(len(self.reward_window)+1.)
+        return self.reward_window.sum()/(len(self.reward_window)+1.)
+
+    def snapshot(self, replay=False):
+        # Copy of the model and of the optimizer (and of the replay memory), it can be written by another
+        # thread while the training goes on
+        snapshot = {'state_dict': {key: value.detach().clone() for key, value in self.model.state_dict().items()},
+                    'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+                    }
+        if replay:
+            snapshot['memory'] = self.memory.state_dict()
+        return snapshot
+
+    def save(self, path='last_model.pth', replay=False):
+        save_atomic(self.snapshot(replay), path)
+
+    def export(self, path='policy.pt'):
+        # TorchScript of the Network for the action selection without the training code (policy.load_policy)
+        return export(self.model, path)
 
-    def save(self):
-        torch.save({'state_dict': self.model.state_dict(),
-                    'optimizer': self.optimizer.state_dict(),
-                    }, 'last_model.pth')
+    def autosave(self, interval=10000, keep=5, replay=False, folder='checkpoints'):
+        # Save in the background every interval steps (update and update_batch), close it to wait for the last save
+        self.checkpointer = Checkpointer(self, interval, keep, replay, folder)
+        return self.checkpointer
 
-    def load(self):
-        if os.path.isfile('last_model.pth'):
-            checkpoint = torch.load('last_model.pth')
+    def load(self, path='last_model.pth'):
+        if os.path.isfile(path):
+            checkpoint = torch.load(path)
             self.model.load_state_dict(checkpoint['state_dict'])
             self.optimizer.load_state_dict(checkpoint['optimizer'])
+            if 'memory' in checkpoint:
+                self.memory.load_state_dict(checkpoint['memory'])
             print("Model loaded")
         else:
             print("Model not found")
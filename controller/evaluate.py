@@ -0,0 +1,96 @@
+# Evaluate a trained controller without Kivy: seeded episodes in the Arena of Game.update (same rewards, wall
+# penalties, goal radius and goal flipping), the same model and seeds always give the same numbers.
+# An episode starts with the robot at the center and ends after goals goals or max_steps steps without goal.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+from arena import Arena, load_data
+from policy import load_policy
+
+
+def run_episode(policy, arena, seed, goals=2, max_steps=2000, greedy=False, random_start=False):
+    torch.manual_seed(seed)
+    arena.rng = np.random.default_rng(seed)
+    state = arena.reset()
+    if random_start:
+        arena.angle = float(arena.rng.uniform(0, 360))
+        arena.orientation = arena.goal_orientation()
+        state = arena.state()
+    select_action = policy.greedy if greedy else policy.sample
+
+    steps_to_goal = []
+    seq_change = 0
+    steps = 0
+    start_time = time.perf_counter()
+    while len(steps_to_goal) < goals and arena.steps < max_steps:
+        state, _, reached = arena.step(select_action(state)[0])
+        steps += 1
+        if reached:
+            steps_to_goal.append(arena.last_steps)
+            seq_change += arena.last_seq_change
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'seed': seed,
+        'goals': len(steps_to_goal),
+        'steps to goal': np.mean(steps_to_goal) if steps_to_goal else np.nan,
+        'sequence switch': seq_change + arena.seq_change,
+        'wall hits': arena.wall_hits,
+        'steps': steps,
+        'steps/s': steps / elapsed
+    }
+
+
+def evaluate(policy, actions, episodes=20, seed=0, width=1280, height=720, **kwargs):
+    arena = Arena(actions, width, height, seed)
+    return pd.DataFrame([run_episode(policy, arena, seed + i, **kwargs) for i in range(episodes)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate a trained controller in the headless arena')
+    parser.add_argument('--model', default='last_model.pth',
+                        help='Checkpoint saved by Dqn.save (.pth) or TorchScript export of policy.py')
+    parser.add_argument('--episodes', type=int, default=20, help='Number of episodes')
+    parser.add_argument('--goals', type=int, default=2, help='Number of goals of an episode')
+    parser.add_argument('--max-steps', type=int, default=2000, help='Maximum number of steps to reach a goal')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first episode')
+    parser.add_argument('--greedy', action='store_true', help='Best action instead of the softmax of Game')
+    parser.add_argument('--random-start', action='store_true', help='Random heading of the robot at the start')
+    parser.add_argument('--width', type=int, default=1280, help='Width of the arena')
+    parser.add_argument('--height', type=int, default=720, help='Height of the arena')
+    parser.add_argument('--output', default=None, help='CSV file of the results of each episode')
+    args = parser.parse_args()
+
+    list_actions = load_data()
+    policy = load_policy(args.model)
+    n_actions = policy.q_values(np.zeros(8)).shape[1]
+    if n_actions != len(list_actions):
+        raise ValueError(f'{args.model} has {n_actions} actions, _all_sequences.pkl gives {len(list_actions)}')
+
+    start_time = time.time()
+    results = evaluate(
+        policy, list_actions, args.episodes, args.seed, args.width, args.height, goals=args.goals,
+        max_steps=args.max_steps, greedy=args.greedy, random_start=args.random_start
+    )
+    elapsed = time.time() - start_time
+
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(results.to_string(index=False, float_format='{:.1f}'.format))
+    reached = results['goals'].sum()
+    print(f'Goals reached : {reached}/{args.episodes * args.goals}')
+    print(f'Steps to goal : mean {results["steps to goal"].mean():.1f}, median {results["steps to goal"].median():.1f}')
+    print(f'Sequence switch : {results["sequence switch"].mean():.1f}, wall hits : {results["wall hits"].mean():.1f} '
+          f'by episode')
+    print(f'Evaluation time [{args.episodes} episodes, {results["steps"].sum()} steps] : {elapsed:.2f}s '
+          f'({results["steps"].sum() / elapsed:.0f} steps/s)')
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
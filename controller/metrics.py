@@ -0,0 +1,110 @@
+import csv
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+# Sum and mean of the last size values in O(1), the values are kept in a ring buffer and the sum is
+# updated with the value that enters and the one that leaves (recomputed at each turn of the buffer
+# so the rounding errors do not add up)
+class RollingMean(object):
+    def __init__(self, size):
+        self.size = size
+        self.values = np.zeros(size)
+        self.position = 0
+        self.count = 0
+        self.total = 0.
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.total += value - self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        if self.position == 0:
+            self.total = float(self.values.sum())
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)[-self.size:]
+        positions = (self.position + np.arange(len(values))) % self.size
+        self.total += float(values.sum() - self.values[positions].sum())
+        self.values[positions] = values
+        wrapped = self.position + len(values) >= self.size
+        self.position = (self.position + len(values)) % self.size
+        self.count = min(self.count + len(values), self.size)
+        if wrapped:
+            self.total = float(self.values.sum())
+
+    def sum(self):
+        return self.total
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+
+# Write perf.csv and perf.png in a background thread, the training loop only puts the results in a queue.
+# The csv is appended one line for each goal and the plot is drawn again every plot_interval goals.
+class MetricsWriter(object):
+    def __init__(self, folder=None, plot_interval=5):
+        folder = Path(__file__).resolve().parent if folder is None else Path(folder)
+        self.csv_path = folder / 'perf.csv'
+        self.plot_path = folder / 'perf.png'
+        self.plot_interval = plot_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def goal(self, steps, seq_change):
+        self.queue.put((steps, seq_change))
+
+    def close(self):
+        # Write what is left in the queue and stop the thread
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        steps_memory = []
+        seq_change_memory = []
+        with open(self.csv_path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['', 'iteration', 'steps', 'sequence switch'])
+            stop = False
+            while not stop:
+                # Everything already in the queue is written together
+                results = [self.queue.get()]
+                while not self.queue.empty():
+                    results.append(self.queue.get())
+                if results[-1] is None:
+                    stop = True
+                    results.pop()
+
+                plots = len(steps_memory) // self.plot_interval
+                for steps, seq_change in results:
+                    i = len(steps_memory)
+                    writer.writerow([i, i, steps, seq_change])
+                    steps_memory.append(steps)
+                    seq_change_memory.append(seq_change)
+                csv_file.flush()
+
+                if len(steps_memory) // self.plot_interval > plots or (stop and steps_memory):
+                    self.plot(steps_memory, seq_change_memory)
+
+    def plot(self, steps_memory, seq_change_memory):
+        # Figure without pyplot, which can only be used from the main thread
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        axs = figure.subplots(1, 1)
+        i = range(len(steps_memory))
+        axs.plot(i, steps_memory, 'r-', label='steps')
+        axs.plot(i, seq_change_memory, 'b-', label='sequence change')
+        axs.set_title('# steps and # sequence change to reach goal')
+        axs.set_xlabel('iteration')
+        axs.set_ylabel('#')
+        axs.legend()
+        figure.savefig(self.plot_path)
@@ -0,0 +1,150 @@
+# Action selection for deployment and for many arenas: no autograd (inference_mode), batches of states and a
+# TorchScript export of the Network that can be loaded with torch.jit.load only, without this code.
+# The export can also be quantized (int8) for small CPU boards.
+
+import argparse
+import copy
+import io
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from arena import BatchArena, load_data
+from network import Network
+
+
+class Policy(object):
+    def __init__(self, model, temperature=10):
+        # model is a Network or a TorchScript module (load_policy)
+        self.model = model.eval()
+        self.temperature = temperature
+
+    def q_values(self, states):
+        # states (input_size,) or (M, input_size), gives (M, nb_action)
+        states = torch.as_tensor(np.asarray(states, dtype=np.float32))
+        if states.dim() == 1:
+            states = states.unsqueeze(0)
+        with torch.inference_mode():
+            return self.model(states)
+
+    def greedy(self, states):
+        # Best action of each state
+        return self.q_values(states).argmax(1)
+
+    def sample(self, states):
+        # Action drawn with the softmax of the Q values, like Dqn.select_action
+        with torch.inference_mode():
+            probs = F.softmax(self.q_values(states) * self.temperature, dim=1)
+            return probs.multinomial(1)[:, 0]
+
+
+def load_network(path='last_model.pth'):
+    # Network of a checkpoint of Dqn.save, the sizes are the ones of the weights
+    state_dict = torch.load(path)['state_dict']
+    model = Network(state_dict['fc1.weight'].shape[1], len(state_dict['fc2.weight']))
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def quantize(model):
+    # Dynamic quantization of fc1 and fc2: int8 weights, the activations are quantized at each call.
+    # The output layer has one row by action, so it is most of the memory and of the time of a call.
+    model = copy.deepcopy(model).eval()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def export(model, path='policy.pt', quantized=False):
+    # TorchScript of the Network with the weights frozen as constants (on a copy, freeze needs the eval mode),
+    # or of its quantized version (the packed int8 weights are already constants)
+    if quantized:
+        scripted = torch.jit.script(quantize(model))
+    else:
+        model = copy.deepcopy(model).eval()
+        scripted = torch.jit.freeze(torch.jit.script(model), preserved_attrs=['input_size', 'nb_action'])
+    torch.jit.save(scripted, path)
+    return scripted
+
+
+def arena_states(actions, model, n_robots=256, n_steps=40, seed=0):
+    # States met by the robots of a BatchArena moving with the policy of model, (n_robots * n_steps, 8)
+    torch.manual_seed(seed)
+    arena = BatchArena(actions, n_robots, seed=seed)
+    policy = Policy(model)
+    states = [arena.reset()]
+    for _ in range(n_steps - 1):
+        states.append(arena.step(policy.sample(states[-1]).numpy())[0])
+    return np.concatenate(states)
+
+
+def latency(model, states, repeats=100):
+    # Median time of a call of model on states [s]
+    states = torch.as_tensor(states, dtype=torch.float32)
+    times = []
+    with torch.inference_mode():
+        model(states)
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            model(states)
+            times.append(time.perf_counter() - start_time)
+    return float(np.median(times))
+
+
+def serialized_size(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def compare(model, quantized_model, states, batch_size=256, repeats=100):
+    # Agreement of the greedy actions of the two models and latency for one state and for a batch
+    agreement = float((Policy(model).greedy(states) == Policy(quantized_model).greedy(states)).float().mean())
+    return {
+        'agreement': agreement,
+        'latency': (latency(model, states[:1], repeats), latency(quantized_model, states[:1], repeats)),
+        'batch_latency': (latency(model, states[:batch_size], repeats),
+                          latency(quantized_model, states[:batch_size], repeats)),
+        'size': (serialized_size(model), serialized_size(quantized_model))
+    }
+
+
+def load_policy(path, temperature=10):
+    # Checkpoint of Dqn.save (.pth) or TorchScript export (any other file)
+    if str(path).endswith('.pth'):
+        return Policy(load_network(path), temperature)
+    return Policy(torch.jit.load(path), temperature)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the Network of a checkpoint to TorchScript')
+    parser.add_argument('--model', default='last_model.pth', help='Checkpoint saved by Dqn.save')
+    parser.add_argument('--output', default='policy.pt', help='TorchScript file')
+    parser.add_argument('--quantize', action='store_true', help='Export the int8 dynamic quantized Network')
+    parser.add_argument('--evaluate', action='store_true',
+                        help='Compare the greedy actions and the latency of the quantized and float Network')
+    parser.add_argument('--engine', default=None, help='Quantized engine (fbgemm on x86, qnnpack on ARM)')
+    args = parser.parse_args()
+
+    if args.engine is not None:
+        torch.backends.quantized.engine = args.engine
+    model = load_network(args.model)
+    export(model, args.output, args.quantize)
+    print(f'Exported {args.model} ({model.input_size} inputs, {model.nb_action} actions) to {args.output}'
+          f'{" (int8)" if args.quantize else ""}')
+
+    if args.evaluate:
+        states = arena_states(load_data(), model)
+        results = compare(model, quantize(model), states)
+        print(f'Greedy action agreement [{len(states)} states] : {100 * results["agreement"]:.2f}%')
+        for name in ['latency', 'batch_latency']:
+            float_time, int8_time = results[name]
+            print(f'{name} : float {1e6 * float_time:.1f}us, int8 {1e6 * int8_time:.1f}us '
+                  f'(x{float_time / int8_time:.2f})')
+        float_size, int8_size = results['size']
+        print(f'size : float {float_size / 1e3:.0f}kB, int8 {int8_size / 1e3:.0f}kB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import numpy as np
+import torch
+
+from replay_memory import ReplayMemory
+
+
+# Binary tree where each node is the sum of its 2 children and the leaves are the priorities of the
+# transitions. The root is the total, a transition is found from a value in [0, total) in O(log n).
+class SumTree(object):
+    def __init__(self, capacity):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+        # Recompute the parents, one level after the other
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        # Go down from the root for all the values at the same time
+        nodes = np.ones(len(values), dtype=int)
+        values = np.array(values, dtype=float)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            right = values >= self.tree[left]
+            values -= self.tree[left] * right
+            nodes = left + right
+        return nodes - self.leaves
+
+    def priorities(self, indices):
+        return self.tree[np.asarray(indices) + self.leaves]
+
+
+# Replay memory sampling the transitions proportionally to their priority (TD error), with the importance
+# sampling weights that correct the bias of this sampling (Schaul et al., Prioritized Experience Replay)
+class PrioritizedReplayMemory(ReplayMemory):
+    def __init__(self, capacity, state_size=8, alpha=0.6, epsilon=1e-3):
+        super(PrioritizedReplayMemory, self).__init__(capacity, state_size)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.max_priority = 1.
+        self.sum_tree = SumTree(capacity)
+
+    def push(self, event):
+        # New transitions get the highest priority so they are sampled at least once
+        position = self.position
+        super(PrioritizedReplayMemory, self).push(event)
+        self.sum_tree.update([position], [self.max_priority ** self.alpha])
+
+    def push_batch(self, states, next_states, actions, rewards):
+        positions = super(PrioritizedReplayMemory, self).push_batch(states, next_states, actions, rewards)
+        self.sum_tree.update(positions.numpy(), self.max_priority ** self.alpha)
+        return positions
+
+    def sample(self, batch_size, beta=0.4):
+        # One value in each of batch_size equal segments of the total
+        segment = self.sum_tree.total() / batch_size
+        values = (np.arange(batch_size) + np.random.random_sample(batch_size)) * segment
+        indices = np.minimum(self.sum_tree.find(values), self.size - 1)
+
+        probabilities = self.sum_tree.priorities(indices) / self.sum_tree.total()
+        weights = (self.size * probabilities) ** -beta
+        weights /= weights.max()
+
+        batch = self.gather(torch.from_numpy(indices))
+        return batch + (indices, torch.tensor(weights, dtype=torch.float32))
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=float)) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.sum_tree.update(indices, priorities ** self.alpha)
+
+    def state_dict(self):
+        state = super(PrioritizedReplayMemory, self).state_dict()
+        state['sum_tree'] = torch.from_numpy(self.sum_tree.tree.copy())
+        state['max_priority'] = self.max_priority
+        return state
+
+    def load_state_dict(self, state):
+        super(PrioritizedReplayMemory, self).load_state_dict(state)
+        self.sum_tree = SumTree(self.capacity)
+        self.sum_tree.tree[:] = state['sum_tree'].numpy()
+        self.max_priority = state['max_priority']
@@ -1,19 +1,62 @@
-import random
-
 import torch
-from torch.autograd import Variable
 
 
+# Ring buffer of the transitions (state, next_state, action, reward) in preallocated tensors,
+# when the memory is full the oldest transition is overwritten
 class ReplayMemory(object):
-    def __init__(self, capacity):
+    def __init__(self, capacity, state_size=8):
         self.capacity = capacity
-        self.memory = []
+        self.states = torch.zeros((capacity, state_size))
+        self.next_states = torch.zeros((capacity, state_size))
+        self.actions = torch.zeros(capacity, dtype=torch.long)
+        self.rewards = torch.zeros(capacity)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
 
     def push(self, event):
-        self.memory.append(event)
-        if len(self.memory) > self.capacity:
-            del self.memory[0]
+        state, next_state, action, reward = event
+        self.states[self.position] = state.reshape(-1)
+        self.next_states[self.position] = next_state.reshape(-1)
+        self.actions[self.position] = int(action)
+        self.rewards[self.position] = float(reward)
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, next_states, actions, rewards):
+        # Several transitions written at once, positions wrapping around the end of the buffer
+        positions = (self.position + torch.arange(len(actions))) % self.capacity
+        self.states[positions] = states
+        self.next_states[positions] = next_states
+        self.actions[positions] = actions
+        self.rewards[positions] = rewards
+        self.position = (self.position + len(actions)) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+        return positions
 
     def sample(self, batch_size):
-        samples = zip(*random.sample(self.memory, batch_size))
-        return map(lambda x: Variable(torch.cat(x, 0)), samples)
+        # Random indices (with replacement) gathered in one operation for each tensor
+        indices = torch.randint(self.size, (batch_size,))
+        return self.gather(indices)
+
+    def gather(self, indices):
+        return self.states[indices], self.next_states[indices], self.actions[indices], self.rewards[indices]
+
+    def state_dict(self):
+        # Copy of the memory, to save it with the model
+        return {
+            'states': self.states.clone(), 'next_states': self.next_states.clone(),
+            'actions': self.actions.clone(), 'rewards': self.rewards.clone(),
+            'position': self.position, 'size': self.size
+        }
+
+    def load_state_dict(self, state):
+        self.states = state['states'].clone()
+        self.next_states = state['next_states'].clone()
+        self.actions = state['actions'].clone()
+        self.rewards = state['rewards'].clone()
+        self.capacity = len(self.actions)
+        self.position = state['position']
+        self.size = state['size']
@@ -0,0 +1,102 @@
+# Train the Deep Q Learning controller without Kivy, as fast as possible (no window and no clock).
+# The model is saved in last_model.pth, it can then be watched with main.py (load button).
+
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+
+from arena import Arena, BatchArena, load_data
+from dqn import Dqn
+from metrics import MetricsWriter
+
+
+def train(model, arena, n_steps, log_interval=1000, metrics=None):
+    state = arena.reset()
+    reward = 0
+    start_time = time.time()
+    for step in range(1, n_steps + 1):
+        action = model.update(reward, state)
+        state, reward, reached = arena.step(action)
+        if reached:
+            print(f'Goal {arena.goal_reached_nb} : {arena.last_steps} steps, '
+                  f'{arena.last_seq_change} sequence change')
+            if metrics is not None:
+                metrics.goal(arena.last_steps, arena.last_seq_change)
+        if step % log_interval == 0:
+            print(f'Step {step} : score {model.score():.2f}, {step / (time.time() - start_time):.0f} steps/s')
+    return arena.goal_reached_nb
+
+
+def train_batch(model, arena, n_steps, batch_size=100, log_interval=1000, metrics=None):
+    # All the robots of the arena move at each step, one learning step for the M transitions
+    states = arena.reset()
+    rewards = np.zeros(arena.n_robots)
+    start_time = time.time()
+    for step in range(1, n_steps + 1):
+        actions = model.update_batch(rewards, states, batch_size)
+        states, rewards, reached = arena.step(actions.numpy())
+        if metrics is not None:
+            for i in np.flatnonzero(reached):
+                metrics.goal(arena.last_steps[i], arena.last_seq_change[i])
+        if step % log_interval == 0:
+            print(f'Step {step} : score {model.score():.2f}, {arena.goal_reached_nb.sum()} goals, '
+                  f'{step * arena.n_robots / (time.time() - start_time):.0f} robot steps/s')
+    return arena.goal_reached_nb.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the controller without the Kivy window')
+    parser.add_argument('--steps', type=int, default=100000, help='Number of training steps')
+    parser.add_argument('--width', type=int, default=1280, help='Width of the arena')
+    parser.add_argument('--height', type=int, default=720, help='Height of the arena')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the random generators')
+    parser.add_argument('--robots', type=int, default=1, help='Number of robots moving together in the arena')
+    parser.add_argument('--batch-size', type=int, default=100, help='Size of the learning batches (several robots)')
+    parser.add_argument('--prioritized', action='store_true', help='Use the prioritized replay memory')
+    parser.add_argument('--load', action='store_true', help='Start from last_model.pth')
+    parser.add_argument('--autosave', type=int, default=10000,
+                        help='Number of steps between two background saves in checkpoints/ (0 to disable)')
+    parser.add_argument('--keep', type=int, default=5, help='Number of checkpoints kept')
+    parser.add_argument('--save-replay', action='store_true', help='Save the replay memory with the model')
+    parser.add_argument('--no-save', action='store_true', help='Do not save last_model.pth at the end')
+    parser.add_argument('--no-metrics', action='store_true', help='Do not write perf.csv and perf.png')
+    parser.add_argument('--log-interval', type=int, default=1000, help='Number of steps between two logs')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        torch.manual_seed(args.seed)
+
+    list_actions = load_data()
+    print(f'Number of actions : {len(list_actions)}')
+    model = Dqn(8, len(list_actions), 0.9, prioritized=args.prioritized)
+    if args.load:
+        model.load()
+    if args.autosave > 0:
+        model.autosave(args.autosave, args.keep, args.save_replay)
+
+    metrics = None if args.no_metrics else MetricsWriter()
+    start_time = time.time()
+    if args.robots > 1:
+        arena = BatchArena(list_actions, args.robots, args.width, args.height, args.seed)
+        goals = train_batch(model, arena, args.steps, args.batch_size, args.log_interval, metrics)
+    else:
+        arena = Arena(list_actions, args.width, args.height, args.seed)
+        goals = train(model, arena, args.steps, args.log_interval, metrics)
+    if metrics is not None:
+        metrics.close()
+    if model.checkpointer is not None:
+        model.checkpointer.close()
+    print(f'Training time [{args.steps} steps, {goals} goals] : {(time.time() - start_time):.2f}s')
+
+    if not args.no_save:
+        model.save(replay=args.save_replay)
+        print("Saved model")
+
+
+if __name__ == '__main__':
+    main()
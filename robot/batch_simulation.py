@@ -0,0 +1,179 @@
+"""
+Module batch_simulation
+
+This module runs many simulations together. Instead of moving each robot step by step with its own
+objects, the state of the N robots is stored in arrays (struct of arrays) and every step is computed
+for all the robots at once with numpy. Each robot keeps its own sequences, phase and reverse actuation.
+The numbers are the same as Simulation.simulate (same operations, in the same order) since the contact
+of the legs is found by comparing exactly their heights.
+
+Nothing is drawn or saved, it is made for batch of simulations like mapping.py.
+
+Attributes
+----------
+simulations : list
+    The N initialized simulations (Simulation), they give the robots and the actuations
+n_steps : int
+    Number of steps of the simulations, the same for all of them
+offsets : numpy Array
+    (N, 4, 3) Offsets of the joints J1, J2, J3 and J4 in the robot reference frame
+invert : numpy Array
+    (N, 4) -1 for the joints vertically reversed (invert_y), 1 otherwise
+legs : numpy Array
+    (N, 4, n_steps, 3) Point C of each joint for each step, in the joint reference frame
+movements : numpy Array
+    (N, 4, n_steps, 2) Displacement x, y of the point C of each joint for each step
+touching_legs : numpy Array
+    (N, 4, n_steps) True when the leg is touching the floor
+position : numpy Array
+    (N, n_steps, 3) Position (x, y, z) of the robots for each step
+angle : numpy Array
+    (N, n_steps, 3) Angles (pitch, roll, yaw) of the robots for each step
+
+Methods
+-------
+__init__(self, simulations)
+    Gather the robots of the simulations
+compute_trajectories(self)
+    Compute the trajectories of the 4 joints of every robot
+simulate(self)
+    Run all the simulations
+update_attitude(self, s)
+    Compute the displacement and the heading of all the robots for the step s
+"""
+import time
+
+import numpy as np
+
+from utils import Utils
+
+
+class BatchSimulation:
+    def __init__(self, simulations):
+        """
+        Gather the robots and the actuations of initialized simulations
+
+        Parameters
+        ----------
+        simulations : list
+            Simulations (Simulation) created with initialize_env for example. They need to have the
+            same number of steps.
+        """
+        self.simulations = list(simulations)
+        n_steps = {len(sim.actuation1) for sim in self.simulations}
+        if len(n_steps) != 1:
+            raise ValueError(f'The simulations need to have the same number of steps, got {sorted(n_steps)}')
+        self.n_steps = n_steps.pop()
+
+        joints = [
+            (sim.robot.J1, sim.robot.J2, sim.robot.J3, sim.robot.J4) for sim in self.simulations
+        ]
+        self.offsets = np.array([
+            [joint.structure_offset.to_list('xyz') for joint in robot_joints] for robot_joints in joints
+        ])
+        self.invert = np.array([
+            [-1 if joint.invert_y else 1 for joint in robot_joints] for robot_joints in joints
+        ])
+
+        n = len(self.simulations)
+        self.legs = np.empty((n, 4, self.n_steps, 3))
+        self.movements = np.empty((n, 4, self.n_steps, 2))
+        self.touching_legs = np.zeros((n, 4, self.n_steps), dtype=bool)
+        self.position = np.zeros((n, self.n_steps, 3))
+        self.angle = np.zeros((n, self.n_steps, 3))
+
+    def compute_trajectories(self):
+        """
+        Compute the trajectory of the point C of the 4 joints of every robot (Joint.get_trajectory, only
+        the trajectories not already in the cache are computed) and its displacement for each step.
+        As in Joint.update_legs, the first step has no displacement and the displacement in y is reversed
+        for the joints with invert_y.
+        """
+        for i, sim in enumerate(self.simulations):
+            robot = sim.robot
+            for j, (joint, actuation, direction) in enumerate([
+                (robot.J1, sim.actuation1, sim.actuation1_direction),
+                (robot.J2, sim.actuation2, sim.actuation2_direction),
+                (robot.J3, sim.actuation2, sim.actuation2_direction),
+                (robot.J4, sim.actuation1, sim.actuation1_direction)
+            ]):
+                self.legs[i, j] = joint.get_trajectory(actuation, direction)[2]
+
+        self.movements[:, :, 0] = 0.0
+        self.movements[:, :, 1:] = np.diff(self.legs[..., :2], axis=2)
+        self.movements[..., 1] *= self.invert[:, :, np.newaxis]
+
+    def simulate(self):
+        """
+        Run all the simulations
+
+        Returns
+        -------
+        numpy Array
+            (N, 3) Final displacement X, displacement Y and heading (yaw) of each simulation
+        """
+        start_time = time.time()
+        self.compute_trajectories()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for s in range(self.n_steps):
+                self.update_attitude(s)
+
+        print(f'Simulation time [{len(self.simulations)} robots] : {(time.time() - start_time):.2f}s')
+
+        return np.column_stack((self.position[:, -1, 0], self.position[:, -1, 1], self.angle[:, -1, 2]))
+
+    def update_attitude(self, s):
+        """
+        Compute the displacement of all the robots for the step s with the legs that are touching
+        the floor (same friction model as Robot.update_attitude)
+
+        Parameters
+        ----------
+        s : int
+            Index of the step
+        """
+        legs_c = self.legs[:, :, s]
+        touching, pitch, roll = Utils.legs_orientation(legs_c, self.offsets)
+        self.touching_legs[:, :, s] = touching
+
+        mov_x = self.movements[:, :, s, 0]
+        mov_y = self.movements[:, :, s, 1]
+
+        # Legs in the robot reference frame
+        c_x = legs_c[:, :, 0] + self.offsets[:, :, 0]
+        c_y = legs_c[:, :, 1] * self.invert + self.offsets[:, :, 1]
+
+        # Proportional reaction force of the touching legs (sum to 1)
+        legs_distance = c_x ** 2
+        ld = legs_distance / Utils.sum_legs(legs_distance, touching)[:, np.newaxis]
+
+        # Displacement proportionnal to weight repartition
+        dx = Utils.sum_legs(mov_x * ld, touching)
+        dy = Utils.sum_legs(mov_y * ld, touching)
+
+        # Compute yaw change, np.dot and np.linalg.norm of Robot.update_attitude for each leg
+        v2 = np.stack((c_x, c_y), axis=-1)
+        v1 = np.stack((c_x - mov_x, c_y - mov_y), axis=-1)
+        cosang = np.matmul(v1[..., np.newaxis, :], v2[..., np.newaxis])[..., 0, 0]
+        cross = v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
+        sinang = np.sqrt(cross * cross)
+        phi = np.sign(cross) * np.arctan2(sinang, cosang)
+
+        # Cut off for very low values of yaw
+        yaw = Utils.sum_legs(phi * ld, touching)
+        yaw[np.abs(yaw) < 1e-10] = 0.
+        if s > 0:
+            yaw += self.angle[:, s - 1, 2]
+
+        # Update dx and dy according to the heading of the robot
+        final_dx = dx * np.cos(yaw) + dy * np.sin(yaw)
+        final_dy = dx * np.sin(yaw) + dy * np.cos(yaw)
+
+        previous = self.position[:, s - 1] if s > 0 else np.zeros((len(self.simulations), 3))
+        self.position[:, s, 0] = previous[:, 0] - final_dx
+        self.position[:, s, 1] = previous[:, 1] - final_dy
+        self.position[:, s, 2] = previous[:, 2]
+        self.angle[:, s, 0] = pitch
+        self.angle[:, s, 1] = roll
+        self.angle[:, s, 2] = yaw
@@ -13,13 +13,17 @@ Attributes
 parser : ArgumentParser
     Attribute that handles the argument given when called in case 1)
 args : Parser argument
-    Contains the argument from command line. If called in case 2), will be None
+    Contains the argument from command line. If called in case 2), will be None. The arguments
+    unknown to this parser are ignored, so scripts importing this module can have their own arguments.
+    --full-cycles simulates every step of every cycle, even when the robot reached a steady state.
 
 Methods
 -------
 initialize_env(sequence='BBBB', phase=0,, reverse=False)
     Create a simulation environement with different parameters comming from the arguments or config
     files.
+load_params(sequence='BBBB', phase=0, reverse=False, steps=20)
+    Build the merged parameters (config file or arguments + default.json) used by initialize_env
 
 """
 import argparse
@@ -33,10 +37,13 @@ parser = argparse.ArgumentParser(description='')
 parser.add_argument('--config',
                     type=str,
                     help='Choose which file from config folder to load')
-args = parser.parse_args()
+parser.add_argument('--full-cycles',
+                    action='store_true',
+                    help='Simulate all the cycles instead of repeating the steady state cycle')
+args, _ = parser.parse_known_args()
 
 
-def initialize_env(sequence='BBBB', phase=0, reverse=False, steps=20):
+def initialize_env(sequence='BBBB', phase=0, reverse=False, steps=20, streaming=False):
     """
     Entry point of the simulation, allows us to initialize a robot and a simulation
     environnement with a config file of with some basics parameters. 
@@ -62,12 +69,28 @@ def initialize_env(sequence='BBBB', phase=0, reverse=False, steps=20):
     steps : int, optional
         represent the number of step used for a simulation. It will be used only if there is
         no config file.
+    streaming : bool, optional
+        If true, the simulation is made to be run with Simulation.stream, with a memory that does not depend
+        on the number of cycles.
 
     Returns
     -------
     Simulation
         return a initialized simulation with the configurations
     """
+    return Simulation(load_params(sequence, phase, reverse, steps), streaming=streaming)
+
+
+def load_params(sequence='BBBB', phase=0, reverse=False, steps=20):
+    """
+    Build the parameters of a simulation : the config file given in argument (or the parameters of
+    the function if there is none) merged with default.json. See initialize_env for the parameters.
+
+    Returns
+    -------
+    dict
+        The merged parameters given to Simulation
+    """
     if args.config is not None:
         with open(f'{Path(__file__).resolve().parent}/config/{args.config}') as param_file:
             params = json.load(param_file)
@@ -103,8 +126,10 @@ def initialize_env(sequence='BBBB', phase=0, reverse=False, steps=20):
         default = json.load(param_file)
 
     Utils.dict_merge(params, default)
+    if args.full_cycles:
+        params['simulation']['steady_state'] = False
 
-    return Simulation(params)
+    return params
 
 
 if __name__ == "__main__":
@@ -21,7 +21,7 @@ ACTUATION_PHASE: list
 REVERSE_ACTUATION : list
     Correspond to the list of boolean to reverse the actuation. Needed if we want to have symmetric results.
     Disable it if speed is important.
-results : list
+df : DataFrame
     Will store the results of the simulation. The results contains the sequence,
     the actuation, the reverse actuation used and the final position of the robot
     in x, y and yaw.
@@ -32,6 +32,20 @@ SIMULATE_THEORY_SEQ : bool
     If true, not only the realistic sequences will be tested but also the theoretical ones.
 STEPS : int
     Represent the number of step used for a simulation.
+BATCH_SIZE : int
+    Number of robots simulated together by BatchSimulation.
+WORKERS : int
+    Number of processes used to simulate, None to use all the cores. This script runs at import, so with
+    the spawn start method (Windows, macOS) use the command line of parallel_mapping.py instead.
+CACHE : bool
+    If true, only the simulations not already in the results cache (results/cache) are done, for example
+    after adding sequences or changing a parameter of the robot.
+CHECKPOINT_FILE : Path
+    File where each finished batch is appended. If the script is stopped, the next run only simulates the
+    combinations that are not in it. None to disable it.
+SYMMETRY : bool
+    If true, the combinations that give the same result (or its mirror image, see symmetry.py) are simulated
+    only once. The derived results are exactly the simulated ones.
 
 """
 
@@ -42,17 +56,19 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
-from main import initialize_env
+from parallel_mapping import (ACTUATION_PHASE, CHECKPOINT,
+                              REALISTIC_SEQUENCES, REVERSE_ACTUATION,
+                              THEORETICAL_SEQUENCES, map_sequences,
+                              save_results)
 
 SIMULATE = True
 SIMULATE_THEORY_SEQ = False
-REALISTIC_SEQUENCES = ['A', 'C', 'E', 'G', 'I', 'B', 'D', 'F', 'H', 'J']
-THEORETICAL_SEQUENCES = ['K', 'L', 'M', 'N', 'O']   # not used
-ACTUATION_PHASE = [0, 180]
-REVERSE_ACTUATION = [False, True]
 STEPS = 10
-
-results = []
+BATCH_SIZE = 500
+WORKERS = 1
+CACHE = True
+CHECKPOINT_FILE = CHECKPOINT
+SYMMETRY = True
 
 if SIMULATE:
     if SIMULATE_THEORY_SEQ:
@@ -61,30 +77,13 @@ if SIMULATE:
         sequences = REALISTIC_SEQUENCES
 
     start = time.time()
-    for s1 in sequences:
-        for s2 in sequences:
-            for s3 in sequences:
-                for s4 in sequences:
-                    for act in ACTUATION_PHASE:
-                        for rev in REVERSE_ACTUATION:
-                            seq = f'{s1}{s2}{s3}{s4}'
-                            sim = initialize_env(seq, act, rev, STEPS)
-                            sim.mapping = True
-
-                            x, y, yaw = sim.simulate()
-                            results.append([seq, act, rev, x, y, yaw])
+    # Robots are simulated together by batches, on WORKERS processes (see parallel_mapping.py)
+    df = map_sequences(sequences, STEPS, WORKERS, BATCH_SIZE, ACTUATION_PHASE, REVERSE_ACTUATION, CACHE,
+                       CHECKPOINT_FILE, SYMMETRY)
 
     print(f'Simulation time : {(time.time() - start) / 60:.0f} minutes {(time.time() - start) % 60:.0f} secondes')
 
-    df = pd.DataFrame(results, columns=['sequence', 'actuation', 'reverse', 'x', 'y', 'yaw'])
-
-    df.to_pickle('{0}/results/_all_sequences.pkl'.format(
-        Path(__file__).resolve().parent
-    ))
-
-    df.to_csv('{0}/results/_all_sequences.csv'.format(
-        Path(__file__).resolve().parent
-    ))
+    save_results(df, CHECKPOINT_FILE)
 
 df = pd.read_pickle('{0}/results/_all_sequences.pkl'.format(
         Path(__file__).resolve().parent
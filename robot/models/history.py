@@ -0,0 +1,163 @@
+"""
+Module History
+
+This module stores the values of a point (or of any vector) for each step of a simulation in a
+preallocated numpy array, instead of a list that grows by one object per step.
+
+Attributes
+----------
+columns : tuple
+    Name of the columns stored, ('x', 'y', 'z') for a point
+data : numpy Array
+    Preallocated array (capacity, number of columns). Only the first rows are filled
+length : int
+    Number of steps stored
+
+Methods
+-------
+__init__(self, _columns=('x', 'y', 'z'), _size=0)
+    Create an empty history
+reserve(self, size)
+    Make sure the history can contain size steps without new allocation
+append(self, values)
+    Store the values of a new step
+extend(self, values)
+    Store the values of several new steps
+repeat(self, steps, n)
+    Store n more times the values of the last steps
+clear(self)
+    Remove all the steps stored
+keep_last(self)
+    Remove all the steps stored except the last one
+array(self)
+    View of the steps stored (length, number of columns), no copy is done
+last(self)
+    View of the values of the last step
+column(self, name)
+    View of one column for all the steps stored
+__getitem__(self, index)
+    history[-1] gives the last step as a Coordinates (for a point) or as an array. A slice gives a view
+"""
+import numpy as np
+from coordinates import Coordinate
+
+
+class History:
+    def __init__(self, _columns=('x', 'y', 'z'), _size=0):
+        """
+        Create an empty history
+
+        Parameters
+        ----------
+        _columns : tuple, optional
+            Name of the columns stored, by default the coordinates of a point
+        _size : int, optional
+            Number of steps to preallocate
+        """
+        self.columns = tuple(_columns)
+        self.data = np.empty((_size, len(self.columns)))
+        self.length = 0
+
+    def reserve(self, size):
+        """
+        Make sure the history can contain a number of steps without new allocation
+
+        Parameters
+        ----------
+        size : int
+            Number of steps
+        """
+        if size > len(self.data):
+            data = np.empty((size, len(self.columns)))
+            data[:self.length] = self.data[:self.length]
+            self.data = data
+
+    def append(self, values):
+        """
+        Store the values of a new step. The capacity is doubled if the history is full.
+
+        Parameters
+        ----------
+        values : array like
+            Values of each column for the step
+        """
+        if self.length == len(self.data):
+            self.reserve(max(2 * len(self.data), 16))
+        self.data[self.length] = values
+        self.length += 1
+
+    def extend(self, values):
+        """
+        Store the values of several new steps at once
+
+        Parameters
+        ----------
+        values : array like
+            (number of steps, number of columns) values of each step
+        """
+        values = np.asarray(values)
+        if self.length + len(values) > len(self.data):
+            self.reserve(max(self.length + len(values), 2 * len(self.data)))
+        self.data[self.length:self.length + len(values)] = values
+        self.length += len(values)
+
+    def repeat(self, steps, n):
+        """
+        Store n more times the values of the last steps (for example the last cycle of a simulation)
+
+        Parameters
+        ----------
+        steps : int
+            Number of steps repeated, taken at the end of the history
+        n : int
+            Number of repetitions
+        """
+        self.extend(np.tile(self.data[self.length - steps:self.length], (n, 1)))
+
+    def clear(self):
+        """
+        Remove all the steps stored, the capacity is kept
+        """
+        self.length = 0
+
+    def keep_last(self):
+        """
+        Remove all the steps stored except the last one (it becomes the first row), the capacity is kept.
+        Used when only the current values are needed, so a simulation can run any number of steps.
+        """
+        if self.length > 1:
+            self.data[0] = self.data[self.length - 1]
+            self.length = 1
+
+    @property
+    def array(self):
+        return self.data[:self.length]
+
+    @property
+    def last(self):
+        return self.data[self.length - 1]
+
+    def column(self, name):
+        """
+        Get one column for all the steps stored
+
+        Parameters
+        ----------
+        name : str
+            Name of the column (for example 'x')
+
+        Returns
+        -------
+        numpy Array
+            View of the column
+        """
+        return self.data[:self.length, self.columns.index(name)]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        values = self.array[index]
+        if isinstance(index, slice) or self.columns != ('x', 'y', 'z'):
+            return values
+        return Coordinate(x=values[0], y=values[1], z=values[2])
@@ -57,12 +57,17 @@ theta_i_top : double
     Current angle of the top block relative to the middle block
 x_offset : double
     Initial offset of the x position of top block's center in Joint reference frame.
-A : Coordinates
-    Coordinates of top block's center in Joint reference frame
-B : Coordinates
-    Coordinates of the middle block's center in Joint reference frame
-C : Coordinates
-    Coordinates of the leg tip in Joint reference frame
+A : History
+    Coordinates of top block's center in Joint reference frame for each step
+B : History
+    Coordinates of the middle block's center in Joint reference frame for each step
+C : History
+    Coordinates of the leg tip in Joint reference frame for each step
+trajectory : tuple
+    Precomputed (A, B, C) arrays used by replay_position, None if the joint is updated step by step.
+    The arrays come from TRAJECTORY_CACHE and are read only
+trajectory_step : int
+    Index of the next step of trajectory to replay
 
 Methods
 -------
@@ -78,11 +83,29 @@ compute_leg_height(self, _A, _B)
     Compute the point C for the Joint
 init_position(self)
     Reset the position of the Joint to initial position (generally from left to right)
+reserve(self, n_steps)
+    Preallocate the history of the points A, B and C
+repeat_cycle(self, cycle_steps, n_cycles)
+    Repeat the last cycle of the points A, B and C
+keep_last(self)
+    Forget the history of the points A, B and C except the last step
 get_real_leg(self)
     Compute and returns the position of the leg in robot's reference frame
 update_position(self, u_i, forward)
     Entry point to compute a step of motion. This function will dispatch to corresponding
     sequence motion update
+compute_trajectory(self, actuation, actuation_direction)
+    Compute the complete trajectory of the points A, B and C for an actuation array in one pass
+trajectory_key(self, actuation, actuation_direction)
+    Key of the trajectory cache, everything the trajectory depends on
+get_trajectory(self, actuation, actuation_direction)
+    Same as compute_trajectory but memoized in TRAJECTORY_CACHE (shared by all the joints)
+fill_forward(self, values, initial, valid)
+    Replace the values of the steps that do not set them by the previous set value
+update_trajectory(self, actuation, actuation_direction)
+    Compute and store the trajectory that will be replayed step by step
+replay_position(self)
+    Replay the next step of the stored trajectory. Equivalent of update_position
 update_seq_X(self, u_i, forward)
     Compute the displacement of the Joint with respect to the sequence
 move_mid_block(self, position=None, theta=None)
@@ -98,6 +121,7 @@ draw_C(self, frame)
 draw_legs(self, frame, location_x, location_y, touching)
     draw a side view of the leg to see where the leg is relative to the ground
 """
+from collections import OrderedDict
 from inspect import currentframe, getframeinfo
 
 import cv2
@@ -107,8 +131,25 @@ from utils import Utils
 
 from models.arm import Arm
 from models.block import Block
+from models.history import History
+from models.sequences import (MID_HALF, MID_POS, MID_THETA, SEQUENCES,
+                              TOP_POS, TOP_THETA)
 from models.spring import Spring
 
+COMPARISONS = {
+    '>=': np.greater_equal,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '<': np.less
+}
+
+# Trajectories (A, B, C) already computed, by Joint.trajectory_key. The trajectory of a joint does not depend
+# on the 3 other joints, so for a mapping only a few of them are computed and shared by all the robots
+# (3 by sequence for a number of steps). Only the TRAJECTORY_CACHE_SIZE last used ones are kept, so a long
+# running process with many numbers of steps or cycles does not keep all of them.
+TRAJECTORY_CACHE = OrderedDict()
+TRAJECTORY_CACHE_SIZE = 256
+
 
 class Joint:
     def __init__(self, _sequence, _structure_offset,
@@ -240,9 +281,12 @@ class Joint:
 
         self.leg_length = _leg_length
 
-        self.A = []
-        self.B = []
-        self.C = []
+        self.A = History()
+        self.B = History()
+        self.C = History()
+
+        self.trajectory = None
+        self.trajectory_step = 0
 
         self.ground_distance = 0.0
 
@@ -273,18 +317,55 @@ class Joint:
 
         Parameters
         ----------
-        _A : Coordinates
-            Point A coordinates
-        _B : Coordinates
-            Point B coordinates
+        _A : numpy Array
+            Point A coordinates (x, y, z)
+        _B : numpy Array
+            Point B coordinates (x, y, z)
 
         Returns
         -------
-        Coordinates
-            Point C coordinates
+        numpy Array
+            Point C coordinates (x, y, z)
+        """
+        tmp = self.leg_length**2 - ((_B[0] - _A[0]) / 2)**2
+        return np.array([(_A[0] + _B[0])/2, (_A[1] + _B[1])/2, np.sqrt(tmp)])
+
+    def reserve(self, n_steps):
+        """
+        Preallocate the history of the points A, B and C for a number of steps
+
+        Parameters
+        ----------
+        n_steps : int
+            Number of steps of the simulation
+        """
+        self.A.reserve(n_steps)
+        self.B.reserve(n_steps)
+        self.C.reserve(n_steps)
+
+    def repeat_cycle(self, cycle_steps, n_cycles):
         """
-        tmp = self.leg_length**2 - ((_B.x - _A.x) / 2)**2
-        return Coordinate(x=(_A.x + _B.x)/2, y=(_A.y + _B.y)/2, z=np.sqrt(tmp))
+        Repeat the last cycle of the points A, B and C, when the simulation skips cycles that are identical
+        (see Robot.repeat_cycle)
+
+        Parameters
+        ----------
+        cycle_steps : int
+            Number of steps of a cycle
+        n_cycles : int
+            Number of cycles added
+        """
+        self.A.repeat(cycle_steps, n_cycles)
+        self.B.repeat(cycle_steps, n_cycles)
+        self.C.repeat(cycle_steps, n_cycles)
+
+    def keep_last(self):
+        """
+        Forget the history of the points A, B and C except the last step (the only one used to move)
+        """
+        self.A.keep_last()
+        self.B.keep_last()
+        self.C.keep_last()
 
     def get_real_leg(self):
         """
@@ -300,12 +381,12 @@ class Joint:
         else:
             inv = 1
 
-        c = self.C[-1]
+        c = self.C.last
 
         c = Coordinate(
-            x=c.x + self.structure_offset.x,
-            y=c.y * inv + self.structure_offset.y,
-            z=c.z + self.structure_offset.z
+            x=c[0] + self.structure_offset.x,
+            y=c[1] * inv + self.structure_offset.y,
+            z=c[2] + self.structure_offset.z
         )
         return c
 
@@ -322,14 +403,274 @@ class Joint:
 
         Returns
         -------
-            Coordinate
-                A coordinate that is the position change vector of point C
+            numpy Array
+                The position change vector (x, y, z) of point C
                 for the step
         """
         # Call the right funcion for the joint sequence update_seq_G for example
         getattr(self, f'update_seq_{self.sequence}')(u_i, forward)
         return self.update_legs()
 
+    def compute_trajectory(self, actuation, actuation_direction):
+        """
+        Compute the points A, B and C for all the steps of an actuation in one pass. It gives exactly
+        the same numbers as calling update_position for each step, but without moving the blocks.
+
+        Every step is split into the elementary motions of the blocks described in models.sequences.
+        The branches, the angles and the heights of the blocks are computed on the whole arrays.
+        Only the horizontal positions of the blocks are accumulated motion after motion, with the same
+        operations as move_mid_block and move_top_block, since the contacts of the legs are found by
+        comparing exactly the heights of the legs.
+
+        Parameters
+        ----------
+        actuation : numpy Array
+            The positions of the actuator for each step (meter)
+        actuation_direction : numpy Array
+            For each step, True for a forward motion and False for a backward motion
+
+        Returns
+        -------
+        tuple
+            Arrays (n_steps, 3) of the points A, B and C
+        """
+        position = np.asarray(actuation, dtype=float) + self.x_offset
+        direction = np.asarray(actuation_direction, dtype=bool)
+        n_steps = len(position)
+
+        max_left = - (self.d_bot / 2) - (self.d_top / 2)
+        max_right = (self.d_bot / 2) + (self.d_top / 2)
+        bounds = {
+            'L': max_left,
+            'R': max_right,
+            'L+bot': max_left + self.d_bot,
+            'L+top': max_left + self.d_top,
+            'R-bot': max_right - self.d_bot,
+            'R-top': max_right - self.d_top
+        }
+        theta_s = {'bot': self.theta_s_bot, 'top': self.theta_s_top}
+
+        # List the motions done in each step (maximum 2 branches of 3 motions)
+        kinds = np.full((n_steps, 2, 3), -1)
+        thetas = np.zeros((n_steps, 2, 3))
+        for forward in [True, False]:
+            branches = SEQUENCES[self.sequence][(forward, self.invert_init_angle)]
+            for b, (condition, operations) in enumerate(branches):
+                mask = direction == forward
+                for comparison, bound in condition:
+                    mask &= COMPARISONS[comparison](position, bounds[bound])
+                for o, operation in enumerate(operations):
+                    if isinstance(operation, tuple):
+                        kind, sign, which = operation
+                        thetas[mask, b, o] = sign * theta_s[which]
+                    else:
+                        kind = operation
+                    kinds[mask, b, o] = kind
+
+        valid = kinds >= 0
+        step = np.nonzero(valid)[0]
+        kind = kinds[valid]
+        theta = thetas[valid]
+        p = position[step]
+
+        bot = self.block_bot
+        mid = self.block_mid
+        top = self.block_top
+        is_mid_theta = kind == MID_THETA
+        is_top_theta = kind == TOP_THETA
+        is_top_pos = kind == TOP_POS
+        is_mid_moved = (kind == MID_POS) | (kind == MID_HALF)
+        is_top = is_top_pos | is_top_theta
+        dh = np.where(is_mid_theta, np.sin(theta) * self.bars_bot.length, np.sin(theta) * self.bars_top.length)
+
+        # Horizontal positions, motion after motion
+        mid_x = np.empty(len(kind))
+        top_x = np.empty(len(kind))
+        internal = np.full(len(kind), np.nan)
+        m = mid.center.x
+        t = top.center.x
+        mid_anchor = self.bars_bot.high_anchor.x
+        bars_top_low = self.bars_top.low_anchor.x
+        bars_top_high = self.bars_top.high_anchor.x
+        bars_bot_low = self.bars_bot.low_anchor.x
+        for i, (k, p_i, dh_i) in enumerate(zip(kind.tolist(), p.tolist(), dh.tolist())):
+            if k == MID_POS or k == MID_HALF:
+                if k == MID_HALF:
+                    p_i = p_i - ((p_i - t) / 2)
+                _dh = p_i - t
+                internal[i] = ((mid_anchor + _dh) - bars_bot_low) / self.bars_bot.length
+                m = m + _dh
+                mid_anchor = m - (mid.width / 2) + mid.anchor_d
+            elif k == MID_THETA:
+                m = bot.center.x + dh_i
+                mid_anchor = m - (mid.width / 2) + mid.anchor_d
+            else:
+                if k == TOP_POS:
+                    internal[i] = ((bars_top_high + (p_i - t)) - bars_top_low) / self.bars_top.length
+                    t = p_i
+                else:
+                    t = m + dh_i
+                bars_top_low = mid_anchor
+                bars_top_high = t - (top.width / 2) + top.anchor_d
+            mid_x[i] = m
+            top_x[i] = t
+
+        if np.any(internal > 1.0):
+            frameinfo = getframeinfo(currentframe())
+            raise ValueError('FILE {0}, LINE {1} : internal = {2}'.format(
+                frameinfo.filename, frameinfo.lineno, np.nanmax(internal)))
+
+        # Heights of the blocks
+        mid_y = np.full(len(kind), np.nan)
+        mid_y[is_mid_moved] = np.cos(np.arcsin(internal[is_mid_moved])) * self.bars_bot.length \
+            + (mid.height / 2) - mid.anchor_d
+        mid_y[is_mid_theta] = bot.get_anchor(type='t').y + (mid.height / 2) - mid.anchor_d \
+            + np.cos(theta[is_mid_theta]) * self.bars_bot.length
+        mid_y = self.fill_forward(mid_y, mid.center.y, is_mid_moved | is_mid_theta)
+
+        dv = np.cos(theta) * self.bars_top.length
+        dv[is_top_pos] = np.cos(np.arcsin(internal[is_top_pos])) * self.bars_top.length
+        top_y = np.full(len(kind), np.nan)
+        top_y[is_top] = (mid_y[is_top] + (mid.height / 2) - mid.anchor_d) \
+            + (top.height / 2) - top.anchor_d + dv[is_top]
+        top_y = self.fill_forward(top_y, top.center.y, is_top)
+
+        # State at the end of each step (last motion of the step, 0 is the initial state)
+        last = np.searchsorted(step, np.arange(n_steps), side='right')
+        mid_x = np.append(mid.center.x, mid_x)[last]
+        top_x = np.append(top.center.x, top_x)[last]
+        mid_y = np.append(mid.center.y, mid_y)[last]
+        top_y = np.append(top.center.y, top_y)[last]
+
+        A = np.column_stack((top_x - (Utils.LEG_OFFSET / 2), top_y, np.zeros(n_steps)))
+        B = np.column_stack((mid_x + (Utils.LEG_OFFSET / 2), mid_y, np.zeros(n_steps)))
+        C = np.column_stack((
+            (A[:, 0] + B[:, 0]) / 2,
+            (A[:, 1] + B[:, 1]) / 2,
+            np.sqrt(self.leg_length**2 - ((B[:, 0] - A[:, 0]) / 2)**2)
+        ))
+        return A, B, C
+
+    def trajectory_key(self, actuation, actuation_direction):
+        """
+        Key of a trajectory in TRAJECTORY_CACHE. The points are in the joint reference frame so the
+        trajectory depends only on the sequence, the initial angle (already reversed with reverse_actuation),
+        the geometry of the joint and the actuation. invert_y and structure_offset are not needed.
+
+        Parameters
+        ----------
+        actuation : numpy Array
+            The positions of the actuator for each step (meter)
+        actuation_direction : numpy Array
+            For each step, True for a forward motion and False for a backward motion
+
+        Returns
+        -------
+        tuple
+        """
+        return (
+            self.sequence,
+            self.invert_init_angle,
+            self.bars_bot.length, self.bars_top.length,
+            self.block_bot.anchor_d, self.block_mid.anchor_d, self.block_top.anchor_d,
+            self.leg_length,
+            np.asarray(actuation, dtype=float).tobytes(),
+            np.asarray(actuation_direction, dtype=bool).tobytes()
+        )
+
+    def get_trajectory(self, actuation, actuation_direction):
+        """
+        Same as compute_trajectory, but the trajectory is computed only once for a key (trajectory_key)
+        and then taken from TRAJECTORY_CACHE (which keeps the TRAJECTORY_CACHE_SIZE last used ones).
+        The arrays returned are read only since they are shared.
+
+        Parameters
+        ----------
+        actuation : numpy Array
+            The positions of the actuator for each step (meter)
+        actuation_direction : numpy Array
+            For each step, True for a forward motion and False for a backward motion
+
+        Returns
+        -------
+        tuple
+            Arrays (n_steps, 3) of the points A, B and C
+        """
+        key = self.trajectory_key(actuation, actuation_direction)
+        if key in TRAJECTORY_CACHE:
+            TRAJECTORY_CACHE.move_to_end(key)
+            return TRAJECTORY_CACHE[key]
+        trajectory = self.compute_trajectory(actuation, actuation_direction)
+        for points in trajectory:
+            points.flags.writeable = False
+        TRAJECTORY_CACHE[key] = trajectory
+        # The least recently used trajectory is forgotten
+        if len(TRAJECTORY_CACHE) > TRAJECTORY_CACHE_SIZE:
+            TRAJECTORY_CACHE.popitem(last=False)
+        return trajectory
+
+    def fill_forward(self, values, initial, valid):
+        """
+        Replace the values that are not set by the last set value before them. The set values are given by a
+        mask and not by NaN, since a set value can be NaN (arcsin of an internal value out of range) and has
+        to be kept like in update_position.
+
+        Parameters
+        ----------
+        values : numpy Array
+        initial : float
+            Value used before the first set value
+        valid : numpy Array
+            True for the values that are set
+
+        Returns
+        -------
+        numpy Array
+        """
+        index = np.where(valid, np.arange(len(values)), -1)
+        index = np.maximum.accumulate(index) if len(index) > 0 else index
+        return np.where(index >= 0, values[index], initial)
+
+    def update_trajectory(self, actuation, actuation_direction):
+        """
+        Compute the trajectory for a complete actuation and store it, so the steps can be replayed
+        with replay_position instead of update_position. The blocks are not moved.
+
+        Parameters
+        ----------
+        actuation : numpy Array
+            The positions of the actuator for each step (meter)
+        actuation_direction : numpy Array
+            For each step, True for a forward motion and False for a backward motion
+        """
+        self.trajectory = self.get_trajectory(actuation, actuation_direction)
+        self.trajectory_step = 0
+
+    def replay_position(self):
+        """
+        Store the next step of the precomputed trajectory
+
+        Returns
+        -------
+            numpy Array
+                The position change vector (x, y, z) of point C
+                for the step
+        """
+        a, b, c = (points[self.trajectory_step] for points in self.trajectory)
+        self.trajectory_step += 1
+
+        # Same as update_legs, the first step has no displacement
+        old_C = self.C.last if len(self.C) != 0 else c
+
+        self.A.append(a)
+        self.B.append(b)
+        self.C.append(c)
+
+        movement = c - old_C
+        if (self.invert_y):
+            movement[1] *= -1
+        return movement
+
     def update_seq_A(self, u_i, forward):
         """
         Cyclic sequence where mid block always move first
@@ -1171,44 +1512,33 @@ class Joint:
 
         Returns
         -------
-        Coordinates
-            Last displacement in a coordinate vector
+        numpy Array
+            Last displacement (x, y, z)
         """
+        A = np.array([
+            self.block_top.center.x - (Utils.LEG_OFFSET / 2),
+            self.block_top.center.y,
+            0
+        ])
+        B = np.array([
+            self.block_mid.center.x + (Utils.LEG_OFFSET / 2),
+            self.block_mid.center.y,
+            0
+        ])
+        C = self.compute_leg_height(A, B)
+
         if len(self.C) != 0:
-            old_C = self.C[-1]
+            old_C = self.C.last
         else:
-            old_A = Coordinate(
-                x=self.block_top.center.x - (Utils.LEG_OFFSET / 2),
-                y=self.block_top.center.y,
-                z=0
-            )
-            old_B = Coordinate(
-                x=self.block_mid.center.x + (Utils.LEG_OFFSET / 2),
-                y=self.block_mid.center.y,
-                z=0
-            )
-            old_C = self.compute_leg_height(old_A, old_B)
+            old_C = C
 
-        self.A.append(
-            Coordinate(
-                x=self.block_top.center.x - (Utils.LEG_OFFSET / 2),
-                y=self.block_top.center.y,
-                z=0
-            )
-        )
-
-        self.B.append(
-            Coordinate(
-                x=self.block_mid.center.x + (Utils.LEG_OFFSET / 2),
-                y=self.block_mid.center.y,
-                z=0
-            )
-        )
+        self.A.append(A)
+        self.B.append(B)
+        self.C.append(C)
 
-        self.C.append(self.compute_leg_height(self.A[-1], self.B[-1]))
-        movement = self.C[-1] - old_C
+        movement = C - old_C
         if (self.invert_y):
-            movement.y *= -1
+            movement[1] *= -1
         return movement
 
     def draw(self, frame):
@@ -13,23 +13,54 @@ J3 : Joint
     Top left joint of the robot
 J4 : Joint
     Bottom left joint of the robot
-position : list
-    List of the position (Coordinates) of the robot's frame for each simulation step
-angle : list
-    List of the angles (pitch, roll, yaw) of the robo's frame for each simulation step
+position : History
+    Position (x, y, z) of the robot's frame for each simulation step
+angle : History
+    Angles (pitch, roll, yaw) of the robo's frame for each simulation step
+motion : History
+    Displacement (dx, dy) and change of heading of the robot in its own reference frame for each step,
+    before the heading is applied
+contacts : History
+    Legs touching the floor (J1, J2, J3, J4) for each step
 
 Methods
 -------
 __init__(self, _J1, _J2, _J3, _J4, phase, reverse_actuation)
     Create an instance of the robot with its 4 Joints
+reserve(self, n_steps)
+    Preallocate the history of the robot and of its 4 Joints
 update_position(self, actuation_1, actuation2, actuation_1_dit, actuation_2_dir)
     Compute the displacement of the 4 Joints
-update_attitude(self, mov_x, mov_y)
+set_sequence(self, sequence)
+    Change the sequence of the 4 Joints, the blocks stay where they are
+step(self, sequence, actuation_1, actuation_2, actuation_1_dir, actuation_2_dir, history=True)
+    Move the robot of one step with the given sequences and actuations (closed loop control)
+update_trajectory(self, actuation_1, actuation_2, actuation_1_dir, actuation_2_dir)
+    Compute the complete trajectory of the 4 Joints for the whole actuation
+replay_position(self)
+    Same as update_position but using the precomputed trajectory of the 4 Joints
+update_attitude(self, mov_x, mov_y, orientation=None)
     Basically the friction model with the computation of the displacement of the robot
     and its change in orientation
+cycle_converged(self, cycle_steps, rtol=1e-12)
+    Check if the last cycle is the same as the previous one
+repeat_cycle(self, cycle_steps, n_cycles)
+    Add cycles identical to the last one without simulating them
+keep_last(self)
+    Forget the history of the robot and of its joints except the last step
 update_orientation(self)
     Compute the pitch/roll orientation of the robot AND compute which legs are touching
     the floor
+contact_ranking(self, legs_z)
+    Ranking of the legs heights, the touching legs are solved again only when it changes
+solve_contact(self, legs_z)
+    Find in <=3 passes which legs are touching the floor
+diagonal_orientation(self, legs_c, first, second)
+    Compute the pitch/roll of the robot on 2 legs in diagonal
+plane_orientation(self, legs_c, plane_legs)
+    Compute the pitch/roll of the robot on the plane of 3 legs
+replay_orientation(self, step)
+    Same as update_orientation but using the orientations computed by update_trajectory
 update_ground(self, pitch, roll)
     Function to compute the ground distance
 draw(self, frame)
@@ -45,11 +76,12 @@ max_actuation(self)
 """
 import cv2
 import numpy as np
-import numpy.ma as ma
 from coordinates import Coordinate
 from utils import Utils
 
+from models.history import History
 from models.joint import Joint
+from models.sequences import SEQUENCES
 
 
 class Robot:
@@ -126,10 +158,38 @@ class Robot:
             _leg_length=_J1['leg_length']
         )
 
-        self.position = []
-        self.angle = []
+        self.position = History()
+        self.angle = History(('pitch', 'roll', 'yaw'))
+        self.motion = History(('dx', 'dy', 'd_yaw'))
+        self.contacts = History(('J1', 'J2', 'J3', 'J4'))
+        self.offsets = np.array([
+            joint.structure_offset.to_list('xyz') for joint in [self.J1, self.J2, self.J3, self.J4]
+        ])
+        self.orientations = None
+        self.contact_key = None
+        self.contact = None
+        self.contact_steps = 0
+        self.contact_reused = 0
         self.ground = 0.0  # Represent the high on the Centre of Gravity of the robot
 
+    def reserve(self, n_steps):
+        """
+        Preallocate the history of the robot and of its 4 joints
+
+        Parameters
+        ----------
+        n_steps : int
+            Number of steps of the simulation
+        """
+        self.position.reserve(n_steps)
+        self.angle.reserve(n_steps)
+        self.motion.reserve(n_steps)
+        self.contacts.reserve(n_steps)
+        self.J1.reserve(n_steps)
+        self.J2.reserve(n_steps)
+        self.J3.reserve(n_steps)
+        self.J4.reserve(n_steps)
+
     def update_position(self, actuation_1, actuation_2, actuation_1_dir, actuation_2_dir):
         mov1 = self.J1.update_position(actuation_1, actuation_1_dir)
         mov4 = self.J4.update_position(actuation_1, actuation_1_dir)
@@ -137,23 +197,137 @@ class Robot:
         mov2 = self.J2.update_position(actuation_2, actuation_2_dir)
         mov3 = self.J3.update_position(actuation_2, actuation_2_dir)
 
-        mov_array_x = np.array([mov1.x, mov2.x, mov3.x, mov4.x])
-        mov_array_y = np.array([mov1.y, mov2.y, mov3.y, mov4.y])
+        mov_array_x = np.array([mov1[0], mov2[0], mov3[0], mov4[0]])
+        mov_array_y = np.array([mov1[1], mov2[1], mov3[1], mov4[1]])
         self.update_attitude(mov_array_x, mov_array_y)
 
-    def update_attitude(self, mov_x, mov_y):
+    def set_sequence(self, sequence):
+        """
+        Change the sequence of the 4 joints. The blocks are not moved (Joint.init_position is not called),
+        the next steps continue from their current position with the new sequences.
+
+        Parameters
+        ----------
+        sequence : str
+            4 characters, the sequences of J1, J2, J3 and J4 (for example 'ABBA')
+        """
+        if len(sequence) != 4 or any(letter not in SEQUENCES for letter in sequence):
+            raise ValueError(f'The sequence needs 4 characters among {"".join(SEQUENCES)}, got {sequence!r}')
+
+        for joint, letter in zip([self.J1, self.J2, self.J3, self.J4], sequence):
+            joint.sequence = letter
+
+    def step(self, sequence, actuation_1, actuation_2, actuation_1_dir, actuation_2_dir, history=True):
+        """
+        Move the robot of one step from its current state, with sequences and actuations chosen for this
+        step only. Used to drive the robot in closed loop (for example by a controller), the sequences
+        can change at any step, even in the middle of a cycle.
+
+        Parameters
+        ----------
+        sequence : str
+            4 characters, the sequences of J1, J2, J3 and J4 for this step
+        actuation_1 : float
+            Position of the actuator 1 (J1 and J4)
+        actuation_2 : float
+            Position of the actuator 2 (J2 and J3)
+        actuation_1_dir : bool
+            Direction of the actuator 1, True for a forward motion
+        actuation_2_dir : bool
+            Direction of the actuator 2, True for a forward motion
+        history : bool, optional
+            If false, only the last step is kept in the history (keep_last), the memory used stays the same
+
+        Returns
+        -------
+        tuple
+            (x, y, yaw) position and heading of the robot after the step
+
+        Raises
+        ------
+        ValueError
+            If the blocks cannot follow the sequences from their current position. It does not happen when
+            the sequences are changed at the end of a half cycle (actuator at 0 or at its maximum). The
+            robot is then in an undefined state and needs to be created again.
+        """
+        self.set_sequence(sequence)
+        error = f'The joints cannot follow the sequence {sequence} from their current position'
+        try:
+            self.update_position(actuation_1, actuation_2, actuation_1_dir, actuation_2_dir)
+        except ValueError as exception:
+            raise ValueError(error) from exception
+
+        x, y, _ = self.position.last
+        yaw = self.angle.last[2]
+        if not np.isfinite([x, y, yaw]).all():
+            raise ValueError(error)
+        if not history:
+            self.keep_last()
+        return x, y, yaw
+
+    def update_trajectory(self, actuation_1, actuation_2, actuation_1_dir, actuation_2_dir):
+        """
+        Compute the trajectory of the 4 joints for all the steps of the actuation in one pass, and
+        which legs are touching the floor with the orientation of the robot for all these steps
+        (Utils.legs_orientation). The steps are then applied with replay_position.
+
+        Parameters
+        ----------
+        actuation_1 : numpy Array
+            Positions of the actuator 1 (J1 and J4)
+        actuation_2 : numpy Array
+            Positions of the actuator 2 (J2 and J3)
+        actuation_1_dir : numpy Array
+            Directions of the actuator 1
+        actuation_2_dir : numpy Array
+            Directions of the actuator 2
+        """
+        self.J1.update_trajectory(actuation_1, actuation_1_dir)
+        self.J4.update_trajectory(actuation_1, actuation_1_dir)
+
+        self.J2.update_trajectory(actuation_2, actuation_2_dir)
+        self.J3.update_trajectory(actuation_2, actuation_2_dir)
+
+        joints = [self.J1, self.J2, self.J3, self.J4]
+        legs_c = np.stack([joint.trajectory[2] for joint in joints], axis=1)
+        self.orientations = Utils.legs_orientation(legs_c, self.offsets)
+
+    def replay_position(self):
+        """
+        Apply the next step of the trajectories computed by update_trajectory
+        """
+        mov1 = self.J1.replay_position()
+        mov4 = self.J4.replay_position()
+
+        mov2 = self.J2.replay_position()
+        mov3 = self.J3.replay_position()
+
+        mov_array_x = np.array([mov1[0], mov2[0], mov3[0], mov4[0]])
+        mov_array_y = np.array([mov1[1], mov2[1], mov3[1], mov4[1]])
+        orientation = self.replay_orientation(len(self.position))
+        self.update_attitude(mov_array_x, mov_array_y, orientation)
+
+    def update_attitude(self, mov_x, mov_y, orientation=None):
         """
         Compute the ground height relative to the robot and compute the displacement of the robot with the legs
         that is touching the floor
+
+        Parameters
+        ----------
+        mov_x : numpy Array
+            Displacement in x of the 4 legs
+        mov_y : numpy Array
+            Displacement in y of the 4 legs
+        orientation : tuple, optional
+            (pitch, roll) of the step if already known (replay_orientation), otherwise update_orientation is called
         """
-        pitch, roll = self.update_orientation()
+        if orientation is None:
+            pitch, roll = self.update_orientation()
+        else:
+            pitch, roll = orientation
 
         dx, dy, dz = 0, 0, 0
 
-        # Select only the touching legs
-        mx = ma.masked_array(mov_x, mask=np.invert(self.touching_legs))
-        my = ma.masked_array(mov_y, mask=np.invert(self.touching_legs))
-
         # create array of proportionnal reaction force
         # We determine this with the distance (momentum)
         c1 = self.J1.get_real_leg().to_list('xyz')
@@ -167,13 +341,12 @@ class Robot:
             np.sum(np.array(c3[0], c3[1]) ** 2),
             np.sum(np.array(c4[0], c4[1]) ** 2)
         ])
-        ld = ma.masked_array(legs_distance, mask=np.invert(self.touching_legs))
-        ld = np.divide(ld, np.sum(ld))  # proportional (sum to 1)
-        # Keep only touching legs
+        # Only the touching legs are added, by mirror pairs (Utils.sum_legs)
+        ld = np.divide(legs_distance, Utils.sum_legs(legs_distance, self.touching_legs))  # proportional (sum to 1)
 
         # Displacement proportionnal to weight repartition
-        dx = np.sum(np.multiply(mx, ld))
-        dy = np.sum(np.multiply(my, ld))
+        dx = Utils.sum_legs(np.multiply(mov_x, ld), self.touching_legs)
+        dy = Utils.sum_legs(np.multiply(mov_y, ld), self.touching_legs)
 
         phi = []
 
@@ -187,35 +360,190 @@ class Robot:
             phi.append(np.sign(cross) * np.arctan2(sinang, cosang))
 
         phi = np.array(phi)
-        masked_phi = ma.masked_array(phi, mask=np.invert(self.touching_legs))
 
         # Cut off for very low values of yaw
-        yaw = np.sum(np.multiply(masked_phi, ld))
+        yaw = Utils.sum_legs(np.multiply(phi, ld), self.touching_legs)
         if abs(yaw) < 1e-10:
             yaw = 0.
+        self.motion.append([dx, dy, yaw])
+        self.contacts.append(self.touching_legs)
         if len(self.position) > 0:
-            yaw += self.angle[-1][2]
+            yaw += self.angle.last[2]
 
         # Update dx and dy according to the heading of the robot
         final_dx = dx * np.cos(yaw) + dy * np.sin(yaw)
         final_dy = dx * np.sin(yaw) + dy * np.cos(yaw)
 
-        delta = Coordinate(x=final_dx, y=final_dy, z=dz)
+        delta = np.array([final_dx, final_dy, dz])
         if len(self.position) == 0:
             self.position.append(-delta)
         else:
-            self.position.append(self.position[-1] - delta)
+            self.position.append(self.position.last - delta)
 
         self.angle.append([pitch, roll, yaw])
 
+    def cycle_converged(self, cycle_steps, rtol=1e-12):
+        """
+        Check if the robot reached a periodic steady state: the last cycle has the same legs positions,
+        the same legs touching the floor and the same displacements (in the robot reference frame) as the
+        previous one.
+
+        Parameters
+        ----------
+        cycle_steps : int
+            Number of steps of a cycle
+        rtol : float, optional
+            Relative tolerance on the legs positions and the displacements
+
+        Returns
+        -------
+        bool
+            True if the 2 last cycles are the same
+        """
+        if len(self.position) < 2 * cycle_steps:
+            return False
+
+        def last_cycles(history):
+            values = history.array[-2 * cycle_steps:]
+            return values[cycle_steps:], values[:cycle_steps]
+
+        current, previous = last_cycles(self.contacts)
+        if not np.array_equal(current, previous):
+            return False
+        for history in [self.motion, self.J1.C, self.J2.C, self.J3.C, self.J4.C]:
+            current, previous = last_cycles(history)
+            if not np.allclose(current, previous, rtol=rtol, atol=0.0):
+                return False
+        return True
+
+    def repeat_cycle(self, cycle_steps, n_cycles):
+        """
+        Add cycles identical to the last one without simulating them. The joints and the legs touching the
+        floor repeat the last cycle, so the displacement of the robot in its reference frame is the same
+        for each cycle. The new positions are the composition of this displacement with the heading of the
+        robot, computed step by step with the same formula as update_attitude.
+
+        Parameters
+        ----------
+        cycle_steps : int
+            Number of steps of a cycle
+        n_cycles : int
+            Number of cycles added
+        """
+        for joint in [self.J1, self.J2, self.J3, self.J4]:
+            joint.repeat_cycle(cycle_steps, n_cycles)
+        self.contacts.repeat(cycle_steps, n_cycles)
+        self.motion.repeat(cycle_steps, n_cycles)
+
+        n_steps = cycle_steps * n_cycles
+        dx, dy, d_yaw = self.motion.array[-n_steps:].T
+        pitch, roll, _ = np.tile(self.angle.array[-cycle_steps:], (n_cycles, 1)).T
+
+        # Same additions as update_attitude, one step after the other
+        yaw = np.add.accumulate(np.concatenate(([self.angle.last[2]], d_yaw)))[1:]
+        final_dx = dx * np.cos(yaw) + dy * np.sin(yaw)
+        final_dy = dx * np.sin(yaw) + dy * np.cos(yaw)
+        x = np.subtract.accumulate(np.concatenate(([self.position.last[0]], final_dx)))[1:]
+        y = np.subtract.accumulate(np.concatenate(([self.position.last[1]], final_dy)))[1:]
+        z = np.full(n_steps, self.position.last[2])
+
+        self.position.extend(np.column_stack((x, y, z)))
+        self.angle.extend(np.column_stack((pitch, roll, yaw)))
+
+    def keep_last(self):
+        """
+        Forget the history of the robot and of its 4 joints except the last step. The next steps only need
+        the last one (update_position), so the memory used stays the same whatever the number of steps.
+        """
+        for history in [self.position, self.angle, self.motion, self.contacts]:
+            history.keep_last()
+        for joint in [self.J1, self.J2, self.J3, self.J4]:
+            joint.keep_last()
+
     def update_orientation(self):
         """
         This function will compute the orientation of the robot relative to the ground.
 
         It will also compute in <=3 passes what legs are touching the floor and from which
-        height.
+        height. The passes (solve_contact) are done again only when the ranking of the legs
+        heights changes, otherwise the touching legs of the previous step are kept and only the
+        angles are computed with the new positions of the legs.
+        """
+        legs_c = np.array([
+            self.J1.C.last,
+            self.J2.C.last,
+            self.J3.C.last,
+            self.J4.C.last
+        ])
+
+        a_pitch = 0.0
+        a_roll = 0.0
+
+        self.contact_steps += 1
+        ranking = self.contact_ranking(legs_c[:, 2])
+        if ranking is not None and ranking == self.contact_key:
+            self.contact_reused += 1
+        else:
+            self.contact_key = ranking
+            self.contact = self.solve_contact(legs_c[:, 2])
+
+        touching_legs, touching_legs_P1, touching_legs_P2, touching_legs_P3, plane_legs = self.contact
+
+        if len(plane_legs) == 2:
+            a_pitch, a_roll = self.diagonal_orientation(legs_c, *plane_legs)
+        elif len(plane_legs) == 3:
+            a_pitch, a_roll = self.plane_orientation(legs_c, plane_legs)
+
+        self.touching_legs = touching_legs
+        self.touching_legs_P1 = touching_legs_P1
+        self.touching_legs_P2 = touching_legs_P2
+        self.touching_legs_P3 = touching_legs_P3
+        self.update_ground(a_pitch, a_roll)
+
+        # Need to place the angles inside -pi/2 -> pi/2
+        a_pitch = Utils.angle_correction(a_pitch)
+        a_roll = Utils.angle_correction(a_roll)
+
+        # print(f"{a_pitch} {a_roll}")
+        return a_pitch, a_roll
+
+    def contact_ranking(self, legs_z):
+        """
+        Ranking of the legs from the lowest to the highest, with the legs at exactly the same height.
+        The touching legs found by solve_contact only depend on it.
+
+        Parameters
+        ----------
+        legs_z : numpy Array
+            Height of the 4 legs
+
+        Returns
+        -------
+        tuple
+            Indexes of the legs sorted by height and for each consecutive pair, True if they are at the
+            same height. None if a height is not a number
+        """
+        z = legs_z.tolist()
+        if any(h != h for h in z):
+            return None
+        order = tuple(sorted(range(4), key=z.__getitem__))
+        return order, tuple(z[order[i]] == z[order[i + 1]] for i in range(3))
+
+    def solve_contact(self, legs_z):
+        """
+        Find in <=3 passes the legs touching the floor
+
+        Parameters
+        ----------
+        legs_z : numpy Array
+            Height of the 4 legs
+
+        Returns
+        -------
+        tuple
+            touching legs, touching legs of the pass 1, 2 and 3 and the legs used to compute the
+            orientation : 2 legs in diagonal or the 3 first legs of the plane
         """
-        ground1, ground2, ground3 = 0, 0, 0
         touching_legs_index = np.array([])
         touching_legs_index_P1 = np.array([])
         touching_legs_index_P2 = np.array([])
@@ -223,19 +551,9 @@ class Robot:
         touching_legs_P1 = np.array([False, False, False, False])
         touching_legs_P2 = np.copy(touching_legs_P1)
         touching_legs_P3 = np.copy(touching_legs_P1)
-
-        legs_c = np.array([
-            self.J1.C[-1].to_list('xyz'),
-            self.J2.C[-1].to_list('xyz'),
-            self.J3.C[-1].to_list('xyz'),
-            self.J4.C[-1].to_list('xyz')
-        ])
-
-        a_pitch = 0.0
-        a_roll = 0.0
+        plane_legs = ()
 
         # get max distance to frame
-        legs_z = legs_c[:, 2]
         ground1 = max(legs_z)
 
         # First pass to understand touching legs
@@ -278,25 +596,10 @@ class Robot:
                     or (touching_legs[1] == touching_legs[2]):
                 if touching_legs[0] or touching_legs[3]:
                     # print('[FIRST PASS 2 legs diag 1-4]')
-                    v = np.subtract(
-                        np.add(legs_c[0, :], self.J1.structure_offset.to_list('xyz')),
-                        np.add(legs_c[3, :], self.J4.structure_offset.to_list('xyz'))
-                    )
-
+                    plane_legs = (0, 3)
                 else:
                     # print('[FIRST PASS 2 legs diag 2-3]')
-                    v = np.subtract(
-                        np.add(legs_c[1, :], self.J2.structure_offset.to_list('xyz')),
-                        np.add(legs_c[2, :], self.J3.structure_offset.to_list('xyz'))
-                    )
-                v_pitch = np.array([v[0], v[2]])
-                v_roll = np.array([v[1], v[2]])
-                w = np.array([1, 0])
-                v_pnorm = np.linalg.norm(v_pitch)
-                v_rnorm = np.linalg.norm(v_roll)
-
-                a_pitch = np.arccos(v_pitch.dot(w) / v_pnorm) * np.sign(np.cross(v_pitch, w))
-                a_roll = np.arccos(v_roll.dot(w) / v_rnorm) * np.sign(np.cross(v_roll, w))
+                    plane_legs = (1, 2)
 
             else:
                 # print('[FIRST PASS 2 legs no diag]')
@@ -332,75 +635,107 @@ class Robot:
 
         if nb_touching_legs == 3:
             # print('[FIRST PASS 3 legs]')
-            # Compute plane vector
-            sub_legs = legs_c[touching_legs_index]
-            offsets = np.array([
-                self.J1.structure_offset.to_list('xyz'),
-                self.J2.structure_offset.to_list('xyz'),
-                self.J3.structure_offset.to_list('xyz'),
-                self.J4.structure_offset.to_list('xyz')
-            ])
-            sub_offset = offsets[touching_legs_index]
-
-            # Compute cross vector to get plane vector
-            v1 = np.subtract(
-                np.add(sub_legs[1, :], sub_offset[1, :]),
-                np.add(sub_legs[0, :], sub_offset[0, :])
-            )
-            v2 = np.subtract(
-                np.add(sub_legs[2, :], sub_offset[2, :]),
-                np.add(sub_legs[0, :], sub_offset[0, :])
-            )
-
-            plane = np.cross(v1, v2)
-
-            a_pitch, a_roll = Utils.angle2ground(plane)
+            plane_legs = tuple(touching_legs_index[:3])
 
         if nb_touching_legs == 4:
             # print('[FIRST PASS 4 legs]')
-            # Compute plane vector
-            offset = np.array([
-                self.J1.structure_offset.to_list('xyz'),
-                self.J2.structure_offset.to_list('xyz'),
-                self.J3.structure_offset.to_list('xyz'),
-                self.J4.structure_offset.to_list('xyz')
-            ])
-
-            # Compute cross vector to get plane vector
-            v1 = np.subtract(
-                np.add(legs_c[1, :], offset[1, :]),
-                np.add(legs_c[0, :], offset[0, :])
-            )
-            v2 = np.subtract(
-                np.add(legs_c[2, :], offset[2, :]),
-                np.add(legs_c[0, :], offset[0, :])
-            )
-
-            plane = np.cross(v1, v2)
-
-            a_pitch, a_roll = Utils.angle2ground(plane)
+            plane_legs = (0, 1, 2)
 
-        self.touching_legs = touching_legs
-        self.touching_legs_P1 = touching_legs_P1
-        self.touching_legs_P2 = touching_legs_P2
-        self.touching_legs_P3 = touching_legs_P3
-        self.update_ground(a_pitch, a_roll)
-
-        # Need to place the angles inside -pi/2 -> pi/2
-        a_pitch = Utils.angle_correction(a_pitch)
-        a_roll = Utils.angle_correction(a_roll)
+        return touching_legs, touching_legs_P1, touching_legs_P2, touching_legs_P3, plane_legs
 
-        # print(f"{a_pitch} {a_roll}")
+    def diagonal_orientation(self, legs_c, first, second):
+        """
+        Compute the pitch and roll of the robot standing on 2 legs in diagonal
+
+        Parameters
+        ----------
+        legs_c : numpy Array
+            Point C of the 4 joints
+        first : int
+            Index of the first leg (0 for J1-J4, 1 for J2-J3)
+        second : int
+            Index of the leg in diagonal
+
+        Returns
+        -------
+        tuple
+            pitch and roll (not corrected)
+        """
+        v = np.subtract(
+            np.add(legs_c[first, :], self.offsets[first]),
+            np.add(legs_c[second, :], self.offsets[second])
+        )
+        v_pitch = np.array([v[0], v[2]])
+        v_roll = np.array([v[1], v[2]])
+        w = np.array([1, 0])
+        v_pnorm = np.linalg.norm(v_pitch)
+        v_rnorm = np.linalg.norm(v_roll)
+
+        a_pitch = np.arccos(v_pitch.dot(w) / v_pnorm) * np.sign(np.cross(v_pitch, w))
+        a_roll = np.arccos(v_roll.dot(w) / v_rnorm) * np.sign(np.cross(v_roll, w))
         return a_pitch, a_roll
 
+    def plane_orientation(self, legs_c, plane_legs):
+        """
+        Compute the pitch and roll of the robot standing on the plane of 3 legs
+
+        Parameters
+        ----------
+        legs_c : numpy Array
+            Point C of the 4 joints
+        plane_legs : tuple
+            Indexes of the 3 legs
+
+        Returns
+        -------
+        tuple
+            pitch and roll (not corrected)
+        """
+        sub_legs = legs_c[list(plane_legs)]
+        sub_offset = self.offsets[list(plane_legs)]
+
+        # Compute cross vector to get plane vector
+        v1 = np.subtract(
+            np.add(sub_legs[1, :], sub_offset[1, :]),
+            np.add(sub_legs[0, :], sub_offset[0, :])
+        )
+        v2 = np.subtract(
+            np.add(sub_legs[2, :], sub_offset[2, :]),
+            np.add(sub_legs[0, :], sub_offset[0, :])
+        )
+
+        plane = np.cross(v1, v2)
+
+        return Utils.angle2ground(plane)
+
+    def replay_orientation(self, step):
+        """
+        Take the touching legs and the orientation of a step from the orientations computed by
+        update_trajectory. Same results as update_orientation.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step in the trajectory
+
+        Returns
+        -------
+        tuple
+            pitch and roll of the robot
+        """
+        touching_legs, pitch, roll = self.orientations
+        self.touching_legs = touching_legs[step]
+        self.update_ground(pitch[step], roll[step])
+        return pitch[step], roll[step]
+
     def update_ground(self, pitch, roll):
         # First compute COG ground high
         concat = [self.J1, self.J2, self.J3, self.J4]
         self.ground = 0.0  # seems to always be 0.00
-        medium = max(self.J1.C[-1].z, self.J2.C[-1].z, self.J3.C[-1].z, self.J4.C[-1].z)
+        medium = max(self.J1.C.last[2], self.J2.C.last[2], self.J3.C.last[2], self.J4.C.last[2])
         for leg, index in zip(self.touching_legs, range(4)):
             if leg:
-                concat[index].ground_distance = concat[index].C[-1].z
+                concat[index].ground_distance = concat[index].C.last[2]
             else:
                 concat[index].ground_distance = medium  # TODO this need to be compupted
 
@@ -474,7 +809,7 @@ class Robot:
 
     def draw_angle(self, frame):
         DISTANCE = 5 / 100
-        angle = self.angle[-1]
+        angle = self.angle.last
         pitch = np.rad2deg(angle[0])
         pitch = min(abs(pitch), 10) * np.sign(pitch)
         roll = np.rad2deg(angle[1])
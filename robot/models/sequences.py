@@ -0,0 +1,152 @@
+"""
+Module sequences
+
+Declarative description of the sequences A-O. This is the same branching logic as the methods
+Joint.update_seq_X, written as data so it can be evaluated on a complete actuation array at once
+(see Joint.compute_trajectory).
+
+For each sequence, the table is indexed by (forward, invert_init_angle) and contains the ordered
+list of branches of the corresponding update_seq_X method. A branch is a tuple (condition, operations):
+    condition : list of (comparison, bound) that must all be true for the position of the actuator.
+        The bounds are 'L' (max_left), 'R' (max_right), 'L+bot', 'L+top', 'R-bot', 'R-top' where bot/top
+        are the displacements d_bot/d_top of the joint.
+    operations : list of block motions executed in order when the condition is true.
+        MID_POS / TOP_POS   -> move_mid_block(position=position) / move_top_block(position=position)
+        MID_HALF            -> move_mid_block(position=half_position)
+        (MID_THETA, s, w)   -> move_mid_block(theta=s * theta_s_w)
+        (TOP_THETA, s, w)   -> move_top_block(theta=s * theta_s_w)
+
+Attributes
+----------
+MID_POS, MID_HALF, MID_THETA, TOP_POS, TOP_THETA : int
+    Identifiers of the block motions
+SEQUENCES : dict
+    Branch table of every sequence
+"""
+MID_POS = 0
+MID_HALF = 1
+MID_THETA = 2
+TOP_POS = 3
+TOP_THETA = 4
+
+# Frequent conditions
+_L_LBOT = [('>=', 'L'), ('<', 'L+bot')]
+_L_LTOP = [('>=', 'L'), ('<', 'L+top')]
+_LBOT_R = [('>=', 'L+bot'), ('<=', 'R')]
+_LTOP_R = [('>=', 'L+top'), ('<=', 'R')]
+_L_RBOT = [('>=', 'L'), ('<=', 'R-bot')]
+_L_RTOP = [('>=', 'L'), ('<=', 'R-top')]
+_RBOT_R = [('>', 'R-bot'), ('<=', 'R')]
+_RTOP_R = [('>', 'R-top'), ('<=', 'R')]
+_L_R = [('>=', 'L'), ('<=', 'R')]
+
+
+def _mid(sign, which):
+    return (MID_THETA, sign, which)
+
+
+def _top(sign):
+    return (TOP_THETA, sign, 'top')
+
+
+# Both blocks moving at the same time (theoretical sequences)
+_HALF = [(_L_R, [MID_HALF, TOP_POS])]
+
+SEQUENCES = {
+    'A': {
+        (True, True): [(_LBOT_R, [MID_POS, _top(1)]), (_L_LBOT, [_mid(-1, 'top'), TOP_POS])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_mid(-1, 'top'), TOP_POS])],
+    },
+    'B': {
+        (True, True): [(_LTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_LTOP, [MID_POS, _top(-1)])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LTOP_R, [MID_POS, _top(1)])],
+        (False, True): [(_L_RBOT, [_mid(-1, 'bot'), TOP_POS]), (_RTOP_R, [MID_POS, _top(1)])],
+        (False, False): [(_RTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_RBOT, [MID_POS, _top(-1)])],
+    },
+    'C': {
+        (True, True): [(_LBOT_R, [MID_POS, _top(1)]), (_L_LBOT, [_mid(-1, 'bot'), TOP_POS])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LBOT_R, [_mid(1, 'bot'), TOP_POS])],
+        (False, True): [(_L_RTOP, [_mid(-1, 'bot'), TOP_POS]), (_RTOP_R, [MID_POS, _top(1)])],
+        (False, False): [(_RTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_RTOP, [MID_POS, _top(-1)])],
+    },
+    'D': {
+        (True, True): [(_LTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_LTOP, [MID_POS, _top(-1)])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LTOP_R, [MID_POS, _top(1)])],
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_mid(1, 'bot'), TOP_POS])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_mid(-1, 'bot'), TOP_POS])],
+    },
+    'E': {
+        (True, True): [(_LTOP_R, [MID_POS, _top(1)]), (_L_LBOT, [_top(-1), MID_POS, _top(-1)])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LTOP_R, [_top(1), MID_POS, _top(1)])],
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_mid(-1, 'top'), TOP_POS])],
+    },
+    'F': {
+        (True, True): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, True): [(_L_RBOT, [_mid(-1, 'bot'), TOP_POS]), (_RTOP_R, [MID_POS, _top(1)])],
+        (False, False): [(_RTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_RBOT, [MID_POS, _top(-1)])],
+    },
+    'G': {
+        (True, True): [(_LBOT_R, [MID_POS, _top(1)]), (_L_LBOT, [_mid(-1, 'top'), TOP_POS])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_top(1), MID_POS, _top(1)])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_top(-1), MID_POS, _top(-1)])],
+    },
+    'H': {
+        (True, True): [(_LTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_LTOP, [MID_POS, _top(-1)])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LTOP_R, [MID_POS, _top(1)])],
+        (False, True): [(_L_RBOT, [_mid(-1, 'bot'), TOP_POS]), (_RTOP_R, [_mid(1, 'top'), TOP_POS])],
+        (False, False): [(_RTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_RBOT, [_mid(-1, 'top'), TOP_POS])],
+    },
+    'I': {
+        (True, True): [(_LTOP_R, [MID_POS, _top(1)]), (_L_LBOT, [_top(-1), MID_POS, _top(-1)])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LTOP_R, [_top(1), MID_POS, _top(1)])],
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_top(1), MID_POS, _top(1)])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_top(-1), MID_POS, _top(-1)])],
+    },
+    'J': {
+        (True, True): [(_LBOT_R, [_mid(1, 'bot'), TOP_POS]), (_L_LTOP, [_mid(-1, 'top'), TOP_POS])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, True): [
+            (_L_RBOT, [_mid(-1, 'top'), TOP_POS]),
+            (_RBOT_R, [_mid(1, 'top'), TOP_POS, _mid(1, 'top')])
+        ],
+        (False, False): [
+            (_RBOT_R, [_mid(1, 'top'), TOP_POS]),
+            (_L_RBOT, [_mid(-1, 'top'), TOP_POS, _mid(-1, 'top')])
+        ],
+    },
+    'K': {
+        (True, True): _HALF,
+        (True, False): _HALF,
+        (False, True): _HALF,
+        (False, False): _HALF,
+    },
+    'L': {
+        (True, True): _HALF,
+        (True, False): _HALF,
+        (False, True): [(_L_RBOT, [_mid(-1, 'bot'), TOP_POS]), (_RTOP_R, [MID_POS, _top(1)])],
+        (False, False): [(_RTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_RBOT, [MID_POS, _top(-1)])],
+    },
+    'M': {
+        (True, True): _HALF,
+        (True, False): _HALF,
+        (False, True): [(_L_RBOT, [MID_POS, _top(-1)]), (_RBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, False): [(_RBOT_R, [MID_POS, _top(1)]), (_L_RBOT, [_mid(-1, 'top'), TOP_POS])],
+    },
+    'N': {
+        (True, True): [(_LBOT_R, [MID_POS, _top(1)]), (_L_LBOT, [_mid(-1, 'top'), TOP_POS])],
+        (True, False): [(_L_LBOT, [MID_POS, _top(-1)]), (_LBOT_R, [_mid(1, 'top'), TOP_POS])],
+        (False, True): _HALF,
+        (False, False): _HALF,
+    },
+    'O': {
+        (True, True): [(_LTOP_R, [_mid(1, 'bot'), TOP_POS]), (_L_LTOP, [MID_POS, _top(-1)])],
+        (True, False): [(_L_LTOP, [_mid(-1, 'bot'), TOP_POS]), (_LTOP_R, [MID_POS, _top(1)])],
+        (False, True): _HALF,
+        (False, False): _HALF,
+    },
+}
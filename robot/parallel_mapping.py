@@ -0,0 +1,427 @@
+"""
+Module parallel_mapping.py
+
+Generate the mapping table (see mapping.py) on several cores. The combinations of sequences, phase and
+reverse actuation are split in chunks that are sent to a pool of processes. Each chunk is simulated with
+BatchSimulation and the results are gathered in the same order and format as mapping.py
+(results/_all_sequences.pkl and results/_all_sequences.csv).
+The results are stored in the ResultCache (results/cache), so only the combinations whose parameters
+(or the code of the simulation) changed are simulated again. Use --no-cache to simulate everything.
+Each finished chunk is also appended to a checkpoint file (results/_all_sequences.partial.csv by default) and
+flushed to the disk. If a run is stopped, the next one reads this file and only simulates the combinations
+that are not in it. Each line has the ResultCache key of its simulation, so the lines written with other
+parameters or another version of the code are not used. The checkpoint is removed once the mapping table
+is saved.
+
+The combinations that give the same result (same trajectories of the joints, or mirror image of the robot with
+respect to its x axis, see symmetry.py) are simulated only once and the others are derived from it. This is
+the case for example of the reverse actuation with a phase of 0. The derived results are exactly the simulated
+ones (the legs are added by mirror pairs, see Utils.sum_legs), which matters since the controller removes the
+duplicates of the mapping table with exact comparisons. Use --no-symmetry to simulate every combination, and
+--check-symmetry to simulate a sample of combinations and of the combination of their group and compare them
+exactly.
+
+It can be imported (map_sequences) or called directly, for example :
+    `python parallel_mapping.py --workers 32 --steps 10 --sequences ACEGIBDFHJKLMNO --chunk-size 500`
+
+Attributes
+----------
+REALISTIC_SEQUENCES : list
+    represent our 10 realistic sequences that are reachable.
+THEORETICAL_SEQUENCES : list
+    represent 5 different sequences that should not be possible in reality (both blocks moving at the same time).
+ACTUATION_PHASE: list
+    Correspond to the list of phase difference we want to play with. Actually supports only 0 and 180 degrees.
+REVERSE_ACTUATION : list
+    Correspond to the list of boolean to reverse the actuation. Needed if we want to have symmetric results.
+COLUMNS : list
+    Columns of the mapping table
+CHECKPOINT : Path
+    Default checkpoint file, one line by finished combination
+CHECKPOINT_COLUMNS : list
+    Columns of the checkpoint file, the key is the ResultCache key of the simulation
+
+Methods
+-------
+list_configurations(sequences, phases=ACTUATION_PHASE, reverses=REVERSE_ACTUATION)
+    List all the combinations (sequence, phase, reverse) to simulate, in the order of mapping.py
+simulate_chunk(chunk, steps)
+    Simulate a list of combinations in the current process
+check_symmetry(sequences, steps=10, samples=20, seed=0)
+    Simulate combinations and another combination of their group and check that the results are the same
+read_checkpoint(path, keys)
+    Read the combinations already simulated from a checkpoint file
+open_checkpoint(path)
+    Open a checkpoint file to append new results
+map_sequences(sequences, steps=10, workers=None, chunk_size=500, phases=ACTUATION_PHASE, reverses=REVERSE_ACTUATION,
+              cache=True, checkpoint=None, symmetry=True)
+    Simulate all the combinations with a pool of processes and return the mapping table
+save_results(df, checkpoint=None)
+    Save the mapping table in the results folder and remove the checkpoint
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from batch_simulation import BatchSimulation
+from main import initialize_env, load_params
+from result_cache import ResultCache
+from symmetry import canonicalize, transform_motion
+
+REALISTIC_SEQUENCES = ['A', 'C', 'E', 'G', 'I', 'B', 'D', 'F', 'H', 'J']
+THEORETICAL_SEQUENCES = ['K', 'L', 'M', 'N', 'O']
+ACTUATION_PHASE = [0, 180]
+REVERSE_ACTUATION = [False, True]
+COLUMNS = ['sequence', 'actuation', 'reverse', 'x', 'y', 'yaw']
+CHECKPOINT = Path(__file__).resolve().parent / 'results' / '_all_sequences.partial.csv'
+CHECKPOINT_COLUMNS = ['sequence', 'actuation', 'reverse', 'key', 'x', 'y', 'yaw']
+
+
+def list_configurations(sequences, phases=ACTUATION_PHASE, reverses=REVERSE_ACTUATION):
+    """
+    List all the combinations to simulate in the same order as the loops of mapping.py
+
+    Parameters
+    ----------
+    sequences : list
+        Sequences that each joint can take (for example ['A', 'B'])
+    phases : list, optional
+        Phase differences of the actuators
+    reverses : list, optional
+        Reverse actuation flags
+
+    Returns
+    -------
+    list
+        List of tuple (sequence of the 4 joints, phase, reverse)
+    """
+    return [
+        (f'{s1}{s2}{s3}{s4}', act, rev)
+        for s1 in sequences
+        for s2 in sequences
+        for s3 in sequences
+        for s4 in sequences
+        for act in phases
+        for rev in reverses
+    ]
+
+
+def simulate_chunk(chunk, steps):
+    """
+    Simulate a chunk of combinations in the current process (executed by the workers of the pool)
+
+    Parameters
+    ----------
+    chunk : list
+        List of tuple (sequence, phase, reverse)
+    steps : int
+        Number of step used for a simulation
+
+    Returns
+    -------
+    numpy Array
+        (len(chunk), 3) x, y and yaw of each combination
+    """
+    simulations = []
+    for seq, act, rev in chunk:
+        sim = initialize_env(seq, act, rev, steps)
+        sim.mapping = True
+        simulations.append(sim)
+
+    return BatchSimulation(simulations).simulate()
+
+
+def check_symmetry(sequences, steps=10, samples=20, seed=0):
+    """
+    Simulate random combinations and another combination of their group (see symmetry.py), and check that
+    the result derived from the other combination is exactly the same (the mapping table is used with exact
+    comparisons, drop_duplicates in the controller)
+
+    Parameters
+    ----------
+    sequences : list
+        Sequences that each joint can take
+    steps : int, optional
+        Number of step used for a simulation
+    samples : int, optional
+        Number of combinations checked
+    seed : int, optional
+        Seed of the random choice of the combinations
+
+    Raises
+    ------
+    AssertionError
+        If a result and the result derived from the other combination of its group differ
+    """
+    configurations = list_configurations(sequences)
+    groups = canonicalize(configurations, steps)
+    members = {}
+    for i, (key, _) in enumerate(groups):
+        members.setdefault(key, []).append(i)
+
+    # Only the combinations that are not alone in their group can be checked
+    rng = np.random.default_rng(seed)
+    candidates = [i for i, (key, _) in enumerate(groups) if len(members[key]) > 1]
+    chosen = rng.choice(candidates, min(samples, len(candidates)), replace=False)
+    others = [rng.choice([j for j in members[groups[i][0]] if j != i]) for i in chosen]
+
+    motions = simulate_chunk([configurations[i] for i in chosen], steps)
+    other_motions = simulate_chunk([configurations[j] for j in others], steps)
+    derived = np.array([
+        transform_motion(motion, groups[i][1] != groups[j][1]) for i, j, motion in zip(chosen, others, other_motions)
+    ])
+    np.testing.assert_array_equal(derived, motions, err_msg='The combinations of a group do not give the same results')
+    print(f'Symmetry check : {len(chosen)} combinations agree')
+
+
+def read_checkpoint(path, keys):
+    """
+    Read the results already written in a checkpoint file. The lines whose key is not the key of their
+    combination (other parameters of the simulation, number of steps or version of the code) are ignored,
+    as well as a last line cut by the end of a run.
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint file
+    keys : dict
+        (sequence, phase, reverse) -> ResultCache key of the simulation
+
+    Returns
+    -------
+    dict
+        (sequence, phase, reverse) -> (x, y, yaw)
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+
+    with open(path, newline='') as checkpoint_file:
+        for row in csv.DictReader(checkpoint_file, fieldnames=CHECKPOINT_COLUMNS):
+            try:
+                config = (row['sequence'], int(row['actuation']), row['reverse'] == 'True')
+                if keys.get(config) != row['key']:
+                    continue
+                results[config] = (float(row['x']), float(row['y']), float(row['yaw']))
+            except (TypeError, ValueError):
+                # Header or incomplete line
+                continue
+    return results
+
+
+def open_checkpoint(path):
+    """
+    Open a checkpoint file to append results. The header is written for a new file, and if the last line
+    was cut (the previous run was stopped while writing), it is removed so the new lines are not mixed with it.
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint file
+
+    Returns
+    -------
+    file
+        File opened in append mode
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists() and path.stat().st_size > 0:
+        with open(path, 'rb+') as checkpoint_file:
+            content = checkpoint_file.read()
+            if not content.endswith(b'\n'):
+                checkpoint_file.truncate(content.rfind(b'\n') + 1)
+
+    checkpoint_file = open(path, 'a', newline='')
+    if checkpoint_file.tell() == 0:
+        csv.writer(checkpoint_file).writerow(CHECKPOINT_COLUMNS)
+    return checkpoint_file
+
+
+def map_sequences(sequences, steps=10, workers=None, chunk_size=500,
+                  phases=ACTUATION_PHASE, reverses=REVERSE_ACTUATION, cache=True, checkpoint=None, symmetry=True):
+    """
+    Simulate all the combinations of sequences with a pool of processes
+
+    Parameters
+    ----------
+    sequences : list
+        Sequences that each joint can take
+    steps : int, optional
+        Number of step used for a simulation
+    workers : int, optional
+        Number of processes, by default the number of cores. With 1 worker, everything is done in the
+        current process.
+    chunk_size : int, optional
+        Number of combinations sent at once to a worker (and simulated together)
+    phases : list, optional
+        Phase differences of the actuators
+    reverses : list, optional
+        Reverse actuation flags
+    cache : bool, optional
+        If true, the results already in the ResultCache are not simulated again and the new ones are stored
+    checkpoint : str, optional
+        Checkpoint file. The combinations already in it are not simulated again and the results of each
+        chunk are appended to it as soon as the chunk is finished. None to disable it.
+    symmetry : bool, optional
+        If true, only one combination of each group of combinations with the same result (see symmetry.py) is
+        simulated, the others are derived from it. The derived results are exactly the simulated ones.
+
+    Returns
+    -------
+    DataFrame
+        The mapping table with the columns of COLUMNS, in the same order as mapping.py
+    """
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be at least 1, got {chunk_size}')
+
+    configurations = list_configurations(sequences, phases, reverses)
+    motions = [None] * len(configurations)
+
+    # Key of each simulation (parameters and version of the code), for the cache and the checkpoint
+    result_cache = ResultCache()
+    keys = [result_cache.key(load_params(seq, act, rev, steps)) for seq, act, rev in configurations]
+
+    # Only the configurations not in the cache are simulated
+    if not cache:
+        result_cache = None
+    if result_cache is not None:
+        motions = [result_cache.get(key) for key in keys]
+        print(f'Results found in cache : {result_cache.hits}/{len(configurations)}')
+
+    # The combinations already in the checkpoint of a previous run are not simulated again
+    if checkpoint is not None:
+        done = read_checkpoint(checkpoint, dict(zip(configurations, keys)))
+        motions = [done.get(config, motion) for config, motion in zip(configurations, motions)]
+        print(f'Results found in checkpoint : {sum(config in done for config in configurations)}/{len(configurations)}')
+
+    # Only one combination of each group is simulated, or none if a result of the group is already known
+    derived = {}
+    if symmetry:
+        groups = canonicalize(configurations, steps)
+        known = {}
+        for i, motion in enumerate(motions):
+            if motion is not None:
+                known.setdefault(groups[i][0], i)
+        for i, motion in enumerate(motions):
+            if motion is None:
+                j = known.setdefault(groups[i][0], i)
+                if j != i:
+                    derived[i] = j
+        print(f'Results derived from a combination of the same group : {len(derived)}/{len(configurations)}')
+    todo = [i for i, motion in enumerate(motions) if motion is None and i not in derived]
+
+    chunks = [todo[c:c + chunk_size] for c in range(0, len(todo), chunk_size)]
+    workers = workers or os.cpu_count()
+    checkpoint_file = open_checkpoint(checkpoint) if checkpoint is not None else None
+
+    def store(chunk_motions):
+        # The results are stored as soon as each chunk is finished (in the order of the chunks)
+        for chunk, chunk_motion in zip(chunks, chunk_motions):
+            rows = []
+            for i, motion in zip(chunk, chunk_motion):
+                motions[i] = tuple(float(value) for value in motion)
+                rows.append([*configurations[i][:3], keys[i], *(repr(value) for value in motions[i])])
+                if result_cache is not None:
+                    result_cache.put(keys[i], motion)
+
+            if checkpoint_file is not None:
+                csv.writer(checkpoint_file).writerows(rows)
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+
+    configuration_chunks = [[configurations[i] for i in chunk] for chunk in chunks]
+    try:
+        if workers == 1 or len(chunks) <= 1:
+            store(map(partial(simulate_chunk, steps=steps), configuration_chunks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                store(pool.map(partial(simulate_chunk, steps=steps), configuration_chunks))
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+    for i, j in derived.items():
+        motions[i] = transform_motion(motions[j], groups[i][1] != groups[j][1])
+
+    results = [[seq, act, rev, x, y, yaw] for (seq, act, rev), (x, y, yaw) in zip(configurations, motions)]
+    return pd.DataFrame(results, columns=COLUMNS)
+
+
+def save_results(df, checkpoint=None):
+    """
+    Save the mapping table in the results folder (pickle and CSV), as mapping.py does
+
+    Parameters
+    ----------
+    df : DataFrame
+        The mapping table
+    checkpoint : str, optional
+        Checkpoint file of the run, removed once the table is saved
+    """
+    df.to_pickle('{0}/results/_all_sequences.pkl'.format(
+        Path(__file__).resolve().parent
+    ))
+
+    df.to_csv('{0}/results/_all_sequences.csv'.format(
+        Path(__file__).resolve().parent
+    ))
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate the mapping table on several processes')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='Number of processes (number of cores by default)')
+    parser.add_argument('--steps',
+                        type=int,
+                        default=10,
+                        help='Number of step used for a simulation')
+    parser.add_argument('--sequences',
+                        type=str,
+                        default=''.join(REALISTIC_SEQUENCES),
+                        help='Sequences that each joint can take, for example ACEGIBDFHJ')
+    parser.add_argument('--chunk-size',
+                        type=int,
+                        default=500,
+                        help='Number of simulations sent at once to a process')
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help='Simulate everything, without reading or writing the results cache')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        default=str(CHECKPOINT),
+                        help='File where the finished simulations are appended, to resume a stopped run')
+    parser.add_argument('--no-checkpoint',
+                        action='store_true',
+                        help='Do not read or write the checkpoint file')
+    parser.add_argument('--no-symmetry',
+                        action='store_true',
+                        help='Simulate every combination instead of one by group of symmetric combinations')
+    parser.add_argument('--check-symmetry',
+                        type=int,
+                        default=0,
+                        metavar='SAMPLES',
+                        help='Simulate SAMPLES random combinations and one of their group and check the results first')
+    args = parser.parse_args()
+
+    if args.check_symmetry > 0:
+        check_symmetry(list(args.sequences), args.steps, args.check_symmetry)
+
+    checkpoint = None if args.no_checkpoint else args.checkpoint
+    start = time.time()
+    df = map_sequences(list(args.sequences), args.steps, args.workers, args.chunk_size,
+                       cache=not args.no_cache, checkpoint=checkpoint, symmetry=not args.no_symmetry)
+    save_results(df, checkpoint)
+    print(f'Simulation time : {(time.time() - start) / 60:.0f} minutes {(time.time() - start) % 60:.0f} secondes')
@@ -0,0 +1,147 @@
+"""
+Module result_cache
+
+Store the results (x, y, yaw) of the simulations on disk, under a hash of everything they depend on:
+the merged parameters of the simulation (config file or arguments + default.json after Utils.dict_merge,
+so the steps, cycles, phase, reverse and geometry of the robot are included) and the version of the
+code that computes them. Running the same simulation again reads the result instead of simulating.
+Each result is a small JSON file results/cache/<2 first characters of the hash>/<hash>.json.
+
+The version of the code is a hash of the source files listed in SOURCES, so any modification of the
+simulation gives new keys (the old files are simply not used anymore).
+
+Attributes
+----------
+SOURCES : list
+    Source files (relative to this folder) that change the results of a simulation
+folder : Path
+    Folder of the cache
+code_version : str
+    Hash of the source files
+hits : int
+    Number of results found in the cache
+misses : int
+    Number of results not found in the cache
+
+Methods
+-------
+__init__(self, _folder=None)
+    Open the cache (results/cache by default)
+compute_code_version()
+    Hash of the source files
+key(self, params)
+    Key of a simulation
+get(self, key)
+    Read a result, None if not in the cache
+put(self, key, result)
+    Store a result
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+SOURCES = ['simulation.py', 'batch_simulation.py', 'utils.py', 'models/*.py']
+
+
+class ResultCache:
+    def __init__(self, _folder=None):
+        """
+        Open the cache
+
+        Parameters
+        ----------
+        _folder : str, optional
+            Folder of the cache, results/cache by default
+        """
+        if _folder is None:
+            _folder = Path(__file__).resolve().parent / 'results' / 'cache'
+        self.folder = Path(_folder)
+        self.code_version = ResultCache.compute_code_version()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def compute_code_version():
+        """
+        Hash the source files of the simulation (computed once by process)
+
+        Returns
+        -------
+        str
+            SHA-256 of the content of the files of SOURCES
+        """
+        root = Path(__file__).resolve().parent
+        sha = hashlib.sha256()
+        for pattern in SOURCES:
+            for path in sorted(root.glob(pattern)):
+                sha.update(path.relative_to(root).as_posix().encode())
+                sha.update(path.read_bytes())
+        return sha.hexdigest()
+
+    def key(self, params):
+        """
+        Compute the key of a simulation
+
+        Parameters
+        ----------
+        params : dict
+            Merged parameters of the simulation (the dictionary given to Simulation)
+
+        Returns
+        -------
+        str
+            SHA-256 of the parameters and of the code version
+        """
+        content = json.dumps({'params': params, 'code': self.code_version}, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def path(self, key):
+        return self.folder / key[:2] / f'{key}.json'
+
+    def get(self, key):
+        """
+        Read a result from the cache
+
+        Parameters
+        ----------
+        key : str
+            Key of the simulation
+
+        Returns
+        -------
+        tuple
+            (x, y, yaw) or None if the simulation is not in the cache
+        """
+        try:
+            with open(self.path(key)) as result_file:
+                result = json.load(result_file)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result['x'], result['y'], result['yaw']
+
+    def put(self, key, result):
+        """
+        Store a result in the cache. The file is written next to its final name then renamed, so a
+        result is either complete or absent.
+
+        Parameters
+        ----------
+        key : str
+            Key of the simulation
+        result : tuple
+            (x, y, yaw)
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        x, y, yaw = (float(value) for value in result)
+
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as result_file:
+            json.dump({'x': x, 'y': y, 'yaw': yaw}, result_file)
+        os.replace(tmp, path)
@@ -0,0 +1,340 @@
+"""
+Module robot_env
+
+Environment for reinforcement learning with N robots at the same time (vectorized, in the style of gym:
+reset() and step(actions)). Each action is a combination of sequences (one letter for each joint) applied
+during one cycle of actuation. The robots are moved by the physical simulator (Robot.step), continuing from
+the state of their blocks, instead of the displacements of the mapping table.
+
+The arena and the rewards are the ones of controller/main.py (Game.update): 6 wall sensors, orientation to
+the goal, reward for the distance gained, for the orientation, for keeping the same sequence, penalty when
+touching a wall and reward for reaching the goal faster than the last time (the goal then goes to the
+opposite corner).
+
+A cycle starts with the actuators at 0, where the blocks of a joint are always in the same position after
+a given sequence. The displacements of the robot during a cycle (in its own reference frame) only depend on
+the previous and the new combination of sequences, so they are simulated once (with a Robot) and stored in
+TRANSITIONS. The pose of each robot is then composed step by step with the formula of Robot.update_attitude.
+With memoize=False, every robot has its own Robot stepped for each action (slower, to compare).
+
+Attributes
+----------
+TRANSITIONS : dict
+    (phase, steps, previous sequence, sequence) -> (displacements (n, 3), contacts (n, 4)) of a cycle
+OBSERVATIONS : list
+    Name of the columns of an observation. The 8 first are the signals of controller/main.py
+n_envs : int
+    Number of robots
+actions : list
+    Combinations of sequences (4 letters) that can be chosen
+phase : int
+    Phase difference of the actuators
+steps : int
+    Number of steps for half a cycle
+width, height : float
+    Size of the arena (pixels)
+scale : float
+    Pixels by meter of displacement
+memoize : bool
+    If true, the displacements of a cycle come from TRANSITIONS, otherwise each robot is simulated
+pose : numpy Array
+    (n_envs, 3) x, y, yaw of the robots in the reference frame of the simulator (meter, radian)
+origin : numpy Array
+    (n_envs, 3) x, y (pixels) and angle (radian) of the reference frame of the simulator in the arena
+goal : numpy Array
+    (n_envs, 2) Position of the goals (pixels)
+
+Methods
+-------
+__init__(self, _n_envs=1, _actions=None, _phase=0, _steps=10, _width=1280, _height=720, _scale=100.,
+         _memoize=True)
+    Create the environment
+reset(self)
+    Put all the robots at the center of the arena
+step(self, actions)
+    Apply one action to each robot for a cycle
+transition(self, i, sequence)
+    Displacements of a robot for a cycle, from TRANSITIONS or simulated
+simulate_cycle(self, i, sequence)
+    Simulate a cycle of the robot i
+position(self)
+    Position of the robots in the arena
+heading(self)
+    Heading of the robots in the arena
+distance(self)
+    Distance of the robots to their goal
+observe(self)
+    Observation of each robot
+"""
+from itertools import product
+
+import numpy as np
+
+from main import load_params
+from simulation import Simulation
+
+TRANSITIONS = {}
+OBSERVATIONS = [
+    'signal1', 'signal2', 'signal3', 'signal4', 'signal5', 'signal6', 'orientation', '-orientation',
+    'x', 'y', 'cos_yaw', 'sin_yaw', 'contact_J1', 'contact_J2', 'contact_J3', 'contact_J4'
+]
+
+
+class RobotEnv:
+    def __init__(self, _n_envs=1, _actions=None, _phase=0, _steps=10, _width=1280, _height=720, _scale=100.,
+                 _memoize=True):
+        """
+        Create the environment, reset needs to be called before the first step
+
+        Parameters
+        ----------
+        _n_envs : int, optional
+            Number of robots
+        _actions : list, optional
+            Combinations of sequences that can be chosen, by default all the combinations of A and B
+        _phase : int, optional
+            Phase difference of the actuators (0 or 180)
+        _steps : int, optional
+            Number of steps for half a cycle
+        _width : float, optional
+            Width of the arena (pixels)
+        _height : float, optional
+            Height of the arena (pixels)
+        _scale : float, optional
+            Pixels by meter of displacement (the mapping table is multiplied by 100 in controller/main.py)
+        _memoize : bool, optional
+            If false, every robot is simulated for every action instead of using TRANSITIONS
+        """
+        if _actions is None:
+            _actions = [''.join(letters) for letters in product('AB', repeat=4)]
+        self.n_envs = _n_envs
+        self.actions = list(_actions)
+        self.phase = _phase
+        self.steps = _steps
+        self.width = _width
+        self.height = _height
+        self.scale = _scale
+        self.memoize = _memoize
+
+        self.simulations = [None] * self.n_envs
+        self.sequence = [None] * self.n_envs
+        self.pose = np.zeros((self.n_envs, 3))
+        self.origin = np.zeros((self.n_envs, 3))
+        self.goal = np.zeros((self.n_envs, 2))
+        self.contacts = np.zeros((self.n_envs, 4), dtype=bool)
+        self.last_action = np.zeros(self.n_envs, dtype=int)
+        self.last_distance = np.zeros(self.n_envs)
+        self.last_orientation = np.zeros(self.n_envs)
+        self.nb_steps = np.zeros(self.n_envs, dtype=int)
+        self.last_steps = np.zeros(self.n_envs, dtype=int)
+        self.seq_change = np.zeros(self.n_envs, dtype=int)
+
+    def reset(self):
+        """
+        Put all the robots at the center of the arena, heading in x, with new blocks (Joint.init_position)
+        and the goal in the top left corner
+
+        Returns
+        -------
+        numpy Array
+            (n_envs, len(OBSERVATIONS)) Observations
+        """
+        self.simulations = [None] * self.n_envs
+        self.sequence = [None] * self.n_envs
+        self.pose[:] = 0.
+        self.origin[:] = [self.width / 2, self.height / 2, 0.]
+        self.goal[:] = [150, self.height - 150]
+        self.contacts[:] = False
+        self.last_action[:] = 0
+        self.nb_steps[:] = 0
+        self.last_steps[:] = 0
+        self.seq_change[:] = 0
+
+        observation = self.observe()
+        self.last_distance = self.distance()
+        self.last_orientation = observation[:, 6].copy()
+        return observation
+
+    def step(self, actions):
+        """
+        Move each robot during a cycle with the combination of sequences of its action, and compute the
+        rewards as Game.update of controller/main.py
+
+        Parameters
+        ----------
+        actions : array like
+            (n_envs,) Index of the action (in actions) of each robot
+
+        Returns
+        -------
+        tuple
+            observations (n_envs, len(OBSERVATIONS)), rewards (n_envs,), dones (n_envs,) True when the
+            goal is reached, infos (dict of arrays, steps and sequence changes of the runs that reached the goal)
+        """
+        actions = np.asarray(actions, dtype=int)
+        transitions = [self.transition(i, self.actions[action]) for i, action in enumerate(actions)]
+        motions = np.stack([motion for motion, _ in transitions])
+        self.contacts = np.stack([contacts[-1] for _, contacts in transitions])
+
+        # Same computation as Robot.update_attitude for each step of the cycle
+        for motion in np.moveaxis(motions, 1, 0):
+            dx, dy, d_yaw = motion.T
+            yaw = d_yaw + self.pose[:, 2]
+            self.pose[:, 0] -= dx * np.cos(yaw) + dy * np.sin(yaw)
+            self.pose[:, 1] -= dx * np.sin(yaw) + dy * np.cos(yaw)
+            self.pose[:, 2] = yaw
+
+        # Robots touching a wall are put back at 10 pixels of it
+        position = self.position()
+        clipped = np.clip(position, 10, [self.width - 10, self.height - 10])
+        walls = np.any(clipped != position, axis=1)
+        if walls.any():
+            self.origin[walls, :2] += clipped[walls] - position[walls]
+
+        self.nb_steps += 1
+        observation = self.observe()
+        distance = self.distance()
+        orientation = observation[:, 6]
+
+        rewards = (self.last_distance - distance) / 6
+        rewards -= 0.2 * (np.abs(self.last_orientation) < np.abs(orientation))
+        rewards += 0.2 * (np.abs(self.last_orientation) > np.abs(orientation))
+        same = actions == self.last_action
+        rewards += 0.02 * same
+        self.seq_change += ~same
+        rewards[walls] = -50
+
+        # Goal reached : the goal goes to the opposite corner
+        dones = distance < 50
+        infos = {'steps': self.nb_steps[dones].copy(), 'sequence_changes': self.seq_change[dones].copy()}
+        if dones.any():
+            rewards[dones] = self.last_steps[dones] - self.nb_steps[dones]
+            self.goal[dones] = [self.width, self.height] - self.goal[dones]
+            self.last_steps[dones] = self.nb_steps[dones]
+            self.nb_steps[dones] = 0
+            self.seq_change[dones] = 0
+            observation = self.observe()
+            distance = self.distance()
+
+        self.last_action = actions
+        self.last_distance = distance
+        self.last_orientation = observation[:, 6].copy()
+        return observation, rewards, dones, infos
+
+    def transition(self, i, sequence):
+        """
+        Displacements of the robot i during a cycle with a combination of sequences (from TRANSITIONS if
+        memoize, the first time it is simulated)
+
+        Parameters
+        ----------
+        i : int
+            Index of the robot
+        sequence : str
+            Combination of sequences of the cycle
+
+        Returns
+        -------
+        tuple
+            numpy Arrays (2 * steps, 3) displacements dx, dy and change of yaw for each step in the reference
+            frame of the robot, (2 * steps, 4) legs touching the floor
+        """
+        previous = self.sequence[i]
+        self.sequence[i] = sequence
+        if not self.memoize:
+            return self.simulate_cycle(i, sequence)
+
+        key = (self.phase, self.steps, previous, sequence)
+        if key not in TRANSITIONS:
+            env = RobotEnv(1, [sequence], self.phase, self.steps, _memoize=False)
+            env.reset()
+            if previous is not None:
+                env.simulate_cycle(0, previous)
+            TRANSITIONS[key] = env.simulate_cycle(0, sequence)
+        return TRANSITIONS[key]
+
+    def simulate_cycle(self, i, sequence):
+        """
+        Simulate a cycle of the robot i with Robot.step, from the current state of its blocks
+
+        Parameters
+        ----------
+        i : int
+            Index of the robot
+        sequence : str
+            Combination of sequences of the cycle
+
+        Returns
+        -------
+        tuple
+            See transition
+        """
+        if self.simulations[i] is None:
+            params = load_params(sequence, self.phase, False, self.steps)
+            self.simulations[i] = Simulation(params, streaming=True)
+        sim = self.simulations[i]
+
+        cycle_steps = 2 * self.steps
+        for a_1, a_2, d_1, d_2 in sim.cycle_actuation(1):
+            sim.robot.step(sequence, a_1, a_2, d_1, d_2)
+        motion = sim.robot.motion.array[-cycle_steps:].copy()
+        contacts = sim.robot.contacts.array[-cycle_steps:].astype(bool)
+        sim.robot.keep_last()
+        return motion, contacts
+
+    def position(self):
+        """
+        Position of the robots in the arena (pixels)
+
+        Returns
+        -------
+        numpy Array
+            (n_envs, 2) x, y
+        """
+        cos, sin = np.cos(self.origin[:, 2]), np.sin(self.origin[:, 2])
+        x = self.pose[:, 0] * cos - self.pose[:, 1] * sin
+        y = self.pose[:, 0] * sin + self.pose[:, 1] * cos
+        return self.origin[:, :2] + self.scale * np.column_stack((x, y))
+
+    def heading(self):
+        return self.origin[:, 2] + self.pose[:, 2]
+
+    def distance(self):
+        return np.linalg.norm(self.position() - self.goal, axis=1)
+
+    def observe(self):
+        """
+        Observation of each robot. The 8 first columns are the signals of controller/main.py : the 6 sensors
+        of the walls (1 when the sensor is at less than 10 pixels of a wall), the orientation to the goal
+        (in [-1, 1]) and its opposite. Then the position (divided by the size of the arena), the heading and
+        the legs touching the floor.
+
+        Returns
+        -------
+        numpy Array
+            (n_envs, len(OBSERVATIONS)) Observations
+        """
+        position = self.position()
+        heading = self.heading()
+
+        # Sensors at 30 pixels in front of the robot (0, +30 and -30 degrees) and behind it
+        signals = []
+        for distance, angle in [(30, 0), (30, 30), (30, -30), (-30, 0), (-30, -30), (-30, 30)]:
+            sensor_angle = heading + np.radians(angle)
+            sensor = position + distance * np.column_stack((np.cos(sensor_angle), np.sin(sensor_angle)))
+            signals.append(np.any(
+                (sensor < 10) | (sensor > [self.width - 10, self.height - 10]), axis=1
+            ).astype(float))
+
+        # Angle between the heading and the goal (Vector.angle of kivy), divided by 180 degrees
+        to_goal = self.goal - position
+        cross = np.cos(heading) * to_goal[:, 1] - np.sin(heading) * to_goal[:, 0]
+        dot = np.cos(heading) * to_goal[:, 0] + np.sin(heading) * to_goal[:, 1]
+        orientation = -np.arctan2(cross, dot) / np.pi
+
+        return np.column_stack(signals + [
+            orientation, -orientation,
+            position[:, 0] / self.width, position[:, 1] / self.height,
+            np.cos(heading), np.sin(heading),
+            self.contacts.astype(float)
+        ])
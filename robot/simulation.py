@@ -13,6 +13,10 @@ AAAA.pkl            -> Data output in pickle format (useful for pandas and pytho
 
 Attributes
 ----------
+StepRecord : namedtuple
+    State of the robot after a step, given by Simulation.stream : step (index), actuation (a_1, a_2, d_1, d_2),
+    legs (4, 3) point C of J1, J2, J3 and J4 in the joint reference frame, contacts (4,) legs touching the
+    floor, position (x, y, z) and angle (pitch, roll, yaw)
 camera_in_robot_ref : bool
     If true, the camera will stick to the reference frame of the robot and we will see the ground moving.
     If false, the camera will be fixed and the robot will move out of the frame.
@@ -29,18 +33,39 @@ reverse_actuation : bool
     Used to generate symmetry in results. It will reverse all the actuations.
 mapping : bool
     If true, it will not produce any output. Used to run batch of simulations. (for example mapping.py)
+vectorized : bool
+    If true, the trajectories of the joints are computed for all the steps in one pass before the simulation
+    instead of step by step. Only used when draw is false since the blocks are not moved.
+streaming : bool
+    If true, only the actuation of one cycle is generated and the histories of the robot are not reserved for
+    all the steps, the simulation is then run with stream (simulate can not be used). The memory does not
+    depend on the number of cycles.
+cycle_steps : int
+    Number of steps of a cycle (2 * actuation_steps)
+steady_state : bool
+    If true, when a cycle is the same as the previous one (same legs positions, legs touching the floor and
+    displacements, see Robot.cycle_converged), the remaining cycles are not simulated but composed from this
+    cycle (Robot.repeat_cycle). False forces the simulation of every step, to compare. Not used with draw.
+params : dict
+    Merged parameters of the simulation
+cache : ResultCache
+    If the parameter cache is true, the results of the simulations are stored on disk and read back when the
+    same simulation (same parameters and same code) is done again. Only used with mapping since nothing
+    else is produced. None otherwise.
 grid_size : float
     Specify the grid size of the background (in meter)
 robot : Robot
     Robot
 actuation1_direction : numpy Array
-    Array containing the direction for all the steps. 1 corresponding to forward motion, 0 for backward
+    Array containing the direction for all the steps (of one cycle with streaming). 1 corresponding to forward
+    motion, 0 for backward
 actuation2_direction : numpy Array
-    Array containing the direction for all the steps. 1 corresponding to forward motion, 0 for backward
+    Array containing the direction for all the steps (of one cycle with streaming). 1 corresponding to forward
+    motion, 0 for backward
 actuation1 : numpy Array
-    Array containing the position of the actuation in 2*steps
+    Array containing the position of the actuation in 2*steps (of one cycle with streaming)
 actuation2 : numpy Array
-    Array containing the position of the actuation in 2*steps
+    Array containing the position of the actuation in 2*steps (of one cycle with streaming)
 blank_frame : numpy Array
     blank image that is copied to generate a new frame instead of creating a new one.
 frame : numpy Array
@@ -48,10 +73,14 @@ frame : numpy Array
 
 Methods
 -------
-__init__(self, *params)
+__init__(self, *params, streaming=False)
     Initialize the simulatio environment including the robot and the actuators
 simulate(self)
     Run the simulation given the parameters
+stream(self, actuation=None, history=False)
+    Run the simulation step by step and yield the state of the robot after each step
+cycle_actuation(self, n_cycles=None)
+    Generate the actuation of the simulation one step after the other, without repeating the arrays
 draw_blocks(self)
     draw the robot, the different views and the legs
 init_video(self, name)
@@ -62,7 +91,7 @@ save_video(self, video)
     save the video file
 create_blank_frame(self)
     initialize the first frame
-generate_actuation(self, phase, reverse=False)
+generate_actuation(self, phase, reverse=False, n_cycles=None)
     Create the arrays of actuations that will be used during the simulation.
 get_joints_data(self, actuation, actuation_direction, joint)
     Gather the different information we need on the displacement and position to save them
@@ -74,6 +103,8 @@ plot_robot_motion(self)
     Export the total displacement in X and Y and the heading for the simulation.
 """
 import time
+from collections import namedtuple
+from itertools import count
 from pathlib import Path
 
 import cv2
@@ -86,11 +117,14 @@ from matplotlib import pyplot as plt
 from matplotlib.colors import ListedColormap
 
 from models.robot import Robot
+from result_cache import ResultCache
 from utils import Utils
 
+StepRecord = namedtuple('StepRecord', ['step', 'actuation', 'legs', 'contacts', 'position', 'angle'])
+
 
 class Simulation:
-    def __init__(self, *params):
+    def __init__(self, *params, streaming=False):
         """
         Initialize the simulation from the config files.
 
@@ -98,6 +132,9 @@ class Simulation:
         ----------
         *params : dictionary
             Contain basically all the config file that were merged previously
+        streaming : bool, optional
+            If true, the simulation is made to be run with stream: only one cycle of actuation is generated and
+            the histories are not reserved, so the memory does not grow with the number of cycles
         """
         s = params[0]['simulation']
         r = params[0]['robot']
@@ -109,6 +146,12 @@ class Simulation:
         self.phase_diff = s['actuation']['phase']
         self.reverse_actuation = s['actuation']['reverse']
         self.mapping = False
+        self.vectorized = s['vectorized']
+        self.steady_state = s['steady_state']
+        self.streaming = streaming
+        self.cycle_steps = 2 * self.actuation_steps
+        self.params = params[0]
+        self.cache = ResultCache() if s['cache'] else None
         self.camera_rotation = s['camera_rotation']
         self.grid_size = s['grid_size']
 
@@ -130,7 +173,9 @@ class Simulation:
                 self.phase_diff
             ))
 
-        self.generate_actuation(self.phase_diff, self.reverse_actuation)
+        self.generate_actuation(self.phase_diff, self.reverse_actuation, 1 if streaming else None)
+        if not streaming:
+            self.robot.reserve(len(self.actuation1))
 
     def simulate(self):
         """
@@ -145,7 +190,29 @@ class Simulation:
             double
                 Heading (yaw)
         """
+        if self.streaming:
+            raise ValueError('A streaming simulation only has one cycle of actuation, run it with stream')
+
+        use_cache = self.cache is not None and self.mapping
+        if use_cache:
+            key = self.cache.key(self.params)
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+
         start_time = time.time()
+        vectorized = self.vectorized and not self.draw
+        if vectorized:
+            self.robot.update_trajectory(
+                self.actuation1,
+                self.actuation2,
+                self.actuation1_direction,
+                self.actuation2_direction
+            )
+
+        cycle_steps = self.cycle_steps
+        steady_state = self.steady_state and not self.draw and self.nb_cycles > 1
+
         for a_1, a_2, d_1, d_2, s in zip(self.actuation1,
                                          self.actuation2,
                                          self.actuation1_direction,
@@ -154,14 +221,27 @@ class Simulation:
 
             if (s % 20 == 0) and (not self.mapping):
                 print(f'step : {s}')
-            self.robot.update_position(a_1, a_2, d_1, d_2)
+            if vectorized:
+                self.robot.replay_position()
+            else:
+                self.robot.update_position(a_1, a_2, d_1, d_2)
             if self.draw:
                 self.draw_blocks()
 
+            # Once a cycle repeats the previous one, the next cycles are the same
+            if steady_state and (s + 1) % cycle_steps == 0 and self.robot.cycle_converged(cycle_steps):
+                cycles_done = (s + 1) // cycle_steps
+                self.robot.repeat_cycle(cycle_steps, self.nb_cycles - cycles_done)
+                if not self.mapping:
+                    print(f'Steady state after {cycles_done}/{self.nb_cycles} cycles')
+                break
+
         end_time = time.time()
 
         seq = f'{self.robot.J1.sequence}{self.robot.J2.sequence}{self.robot.J3.sequence}{self.robot.J4.sequence}'
         print(f'Simulation time [{seq}]-{self.phase_diff}-{self.reverse_actuation} : {(end_time - start_time):.2f}s')
+        if not vectorized and not self.mapping:
+            print(f'Contacts reused : {self.robot.contact_reused}/{self.robot.contact_steps} steps')
 
         if self.draw:
             self.save_video(self.blocks_video)
@@ -171,7 +251,74 @@ class Simulation:
             self.plot_legs_motion()
             self.plot_robot_motion()
 
-        return self.robot.position[-1].x, self.robot.position[-1].y, self.robot.angle[-1][2]
+        result = self.robot.position[-1].x, self.robot.position[-1].y, self.robot.angle[-1][2]
+        if use_cache:
+            self.cache.put(key, result)
+
+        return result
+
+    def stream(self, actuation=None, history=False):
+        """
+        Run the simulation one step after the other and give the state of the robot after each step.
+        Nothing is drawn or saved, and the steady state is not used (the actuation can be anything).
+
+        Parameters
+        ----------
+        actuation : iterable, optional
+            Tuples (a_1, a_2, d_1, d_2) : position of the actuators 1 and 2 (meter) and their directions
+            (True for a forward motion). It can be a generator, for example cycle_actuation() (by default)
+            or any waveform.
+        history : bool, optional
+            If true, the history of the robot and of its joints is kept (like simulate). Otherwise only
+            the last step is kept, so the memory used does not grow with the number of steps (with a
+            simulation created with streaming, which does not generate the actuation of all the cycles).
+
+        Yields
+        ------
+        StepRecord
+            State of the robot after the step (copies, they are not modified by the next steps)
+        """
+        if actuation is None:
+            actuation = self.cycle_actuation(self.nb_cycles)
+        joints = [self.robot.J1, self.robot.J2, self.robot.J3, self.robot.J4]
+
+        for s, (a_1, a_2, d_1, d_2) in zip(count(), actuation):
+            self.robot.update_position(a_1, a_2, d_1, d_2)
+            record = StepRecord(
+                s,
+                (a_1, a_2, d_1, d_2),
+                np.array([joint.C.last for joint in joints]),
+                np.array(self.robot.touching_legs),
+                self.robot.position.last.copy(),
+                self.robot.angle.last.copy()
+            )
+            if not history:
+                self.robot.keep_last()
+            yield record
+
+    def cycle_actuation(self, n_cycles=None):
+        """
+        Generate the actuation of a cycle (generate_actuation) repeated n_cycles times, one step after the
+        other, without creating the arrays of all the cycles
+
+        Parameters
+        ----------
+        n_cycles : int, optional
+            Number of cycles, None to repeat them without end
+
+        Yields
+        ------
+        tuple
+            (a_1, a_2, d_1, d_2) for each step
+        """
+        cycle_steps = self.cycle_steps
+        cycle = list(zip(self.actuation1[:cycle_steps],
+                         self.actuation2[:cycle_steps],
+                         self.actuation1_direction[:cycle_steps],
+                         self.actuation2_direction[:cycle_steps]))
+        cycles = count() if n_cycles is None else range(n_cycles)
+        for _ in cycles:
+            yield from cycle
 
     def draw_blocks(self):
         """
@@ -328,7 +475,7 @@ class Simulation:
     def create_blank_frame(self):
         self.blank_frame = np.ones((Utils.HEIGHT, Utils.WIDTH, 3), dtype=np.uint8) * 255
 
-    def generate_actuation(self, phase, reverse=False):
+    def generate_actuation(self, phase, reverse=False, n_cycles=None):
         """
         Create the different array of displacement for the artuators
 
@@ -338,7 +485,11 @@ class Simulation:
             Phase difference of the actuators, can be 0 or 180 (zero is both actuators extends at the same time)
         reverse : bool, optional
             Optional parameter to reverse the actuation. Used only to generate symmetric results.
+        n_cycles : int, optional
+            Number of cycles of the arrays, nb_cycles by default
         """
+        if n_cycles is None:
+            n_cycles = self.nb_cycles
         # Get maximum actuation movement
         steps = self.actuation_steps
         max_1, max_2 = self.robot.max_actuation()
@@ -391,10 +542,10 @@ class Simulation:
                 axis=0
             )
 
-        self.actuation1 = np.tile(self.actuation1, self.nb_cycles)
-        self.actuation2 = np.tile(self.actuation2, self.nb_cycles)
-        self.actuation1_direction = np.tile(self.actuation1_direction, self.nb_cycles)
-        self.actuation2_direction = np.tile(self.actuation2_direction, self.nb_cycles)
+        self.actuation1 = np.tile(self.actuation1, n_cycles)
+        self.actuation2 = np.tile(self.actuation2, n_cycles)
+        self.actuation1_direction = np.tile(self.actuation1_direction, n_cycles)
+        self.actuation2_direction = np.tile(self.actuation2_direction, n_cycles)
 
         if reverse:
             t = self.actuation1
@@ -419,9 +570,9 @@ class Simulation:
         DataFrame
             A pandas dataframe that contains all the relevant data for the joint during the simulation
         """
-        a_x, a_y, a_z = Utils.list_coord2list(joint.A)
-        b_x, b_y, b_z = Utils.list_coord2list(joint.B)
-        c_x, c_y, c_z = Utils.list_coord2list(joint.C)
+        a_x, a_y, a_z = joint.A.array.T
+        b_x, b_y, b_z = joint.B.array.T
+        c_x, c_y, c_z = joint.C.array.T
 
         data = [
             actuation,
@@ -454,7 +605,7 @@ class Simulation:
         J3 = self.get_joints_data(self.actuation2, self.actuation1_direction, self.robot.J3)
         J4 = self.get_joints_data(self.actuation1, self.actuation1_direction, self.robot.J4)
 
-        x, y, z = Utils.list_coord2list(self.robot.position)
+        x, y, z = self.robot.position.array.T
 
         robot = pd.DataFrame(
             np.array([
@@ -463,9 +614,9 @@ class Simulation:
                 self.actuation2,
                 self.actuation2_direction,
                 x, y, z,
-                np.array(self.robot.angle)[:, 0],
-                np.array(self.robot.angle)[:, 1],
-                np.array(self.robot.angle)[:, 2]
+                self.robot.angle.column('pitch'),
+                self.robot.angle.column('roll'),
+                self.robot.angle.column('yaw')
             ]).T,
             columns=[
                 'u1', 'u1_dir',
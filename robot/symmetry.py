@@ -0,0 +1,168 @@
+"""
+Module symmetry
+
+Group the combinations (sequence, phase, reverse) of the mapping table that give the same result, so only
+one combination of each group needs to be simulated.
+
+The result of a simulation only depends on the trajectories of the point C of the 4 joints (the robot is
+otherwise always the same). Two combinations whose joints have the same trajectories have the same result,
+even if their sequences are different (for example with a phase of 180 and reverse actuation, several
+sequences give the same trajectory since the actuation never reaches the branches that differ).
+The robot is also symmetric with respect to its x axis: J3 and J4 are J1 and J2 vertically reversed
+(invert_y). Exchanging the trajectories of J1/J3 and J2/J4 gives the mirror image of the motion, with the
+same x and the opposite y and yaw. This is the case of the reverse actuation with a phase of 0, which swaps
+actuation1/actuation2 and flips invert_init_angle.
+The simulation adds the legs by mirror pairs (Utils.sum_legs), so the mirror image is exact to the last bit.
+
+Each combination gets a key, the identifiers of its 4 trajectories in the order J1, J2, J3, J4, and the
+smallest of this key and of its mirror key is kept (with a flag telling if the result needs to be mirrored).
+
+Methods
+-------
+joint_signatures(sequences, phase, reverse, steps, identifiers)
+    Identify the trajectory of each sequence for each joint
+is_symmetric(offsets)
+    Check that the joints J3 and J4 are the mirror of J1 and J2
+canonicalize(configurations, steps)
+    Give the key of the group of each combination
+mirror_motion(motion)
+    Mirror image of a result
+transform_motion(motion, mirrored)
+    Result of a combination from the result of another combination of its group
+"""
+import numpy as np
+
+from main import initialize_env
+
+
+def joint_signatures(sequences, phase, reverse, steps, identifiers):
+    """
+    Identify the trajectory of each sequence for each joint. The trajectories come from Joint.get_trajectory
+    (the same cache as the simulations).
+
+    Parameters
+    ----------
+    sequences : list
+        Sequences that each joint can take
+    phase : int
+        Phase difference of the actuators
+    reverse : bool
+        Reverse actuation
+    steps : int
+        Number of step used for a simulation
+    identifiers : dict
+        Identifier of each trajectory already seen (bytes of the trajectory -> int), new trajectories are added
+
+    Returns
+    -------
+    tuple
+        (dict sequence -> tuple of the identifiers of the trajectories of J1, J2, J3 and J4,
+        numpy Array (4, 3) offsets of the joints)
+    """
+    signatures = {}
+    for seq in sequences:
+        sim = initialize_env(seq * 4, phase, reverse, steps)
+        robot = sim.robot
+        signature = []
+        for joint, actuation, direction in [
+            (robot.J1, sim.actuation1, sim.actuation1_direction),
+            (robot.J2, sim.actuation2, sim.actuation2_direction),
+            (robot.J3, sim.actuation2, sim.actuation2_direction),
+            (robot.J4, sim.actuation1, sim.actuation1_direction)
+        ]:
+            trajectory = joint.get_trajectory(actuation, direction)[2].tobytes()
+            signature.append(identifiers.setdefault(trajectory, len(identifiers)))
+        signatures[seq] = tuple(signature)
+
+    return signatures, robot.offsets
+
+
+def is_symmetric(offsets):
+    """
+    Check that the robot is symmetric with respect to its x axis
+
+    Parameters
+    ----------
+    offsets : numpy Array
+        (4, 3) Offsets of the joints J1, J2, J3 and J4
+
+    Returns
+    -------
+    bool
+        True if J3 and J4 are at the position of J1 and J2 with the opposite y
+    """
+    mirror = np.array([1, -1, 1])
+    return bool(np.all(offsets[2] == offsets[0] * mirror) and np.all(offsets[3] == offsets[1] * mirror))
+
+
+def canonicalize(configurations, steps):
+    """
+    Give the key of the group of each combination. The combinations with the same key have the same result,
+    up to mirror_motion when their flags are different.
+
+    Parameters
+    ----------
+    configurations : list
+        List of tuple (sequence, phase, reverse)
+    steps : int
+        Number of step used for a simulation
+
+    Returns
+    -------
+    list
+        List of tuple (key, mirrored) for each combination
+    """
+    sequences = sorted({letter for seq, _, _ in configurations for letter in seq})
+    identifiers = {}
+    signatures = {}
+    symmetric = True
+    for act, rev in sorted({(act, rev) for _, act, rev in configurations}):
+        signatures[act, rev], offsets = joint_signatures(sequences, act, rev, steps, identifiers)
+        symmetric = symmetric and is_symmetric(offsets)
+
+    groups = []
+    for seq, act, rev in configurations:
+        key = tuple(signatures[act, rev][letter][j] for j, letter in enumerate(seq))
+        mirror_key = (key[2], key[3], key[0], key[1])
+        if symmetric and mirror_key < key:
+            groups.append((mirror_key, True))
+        else:
+            groups.append((key, False))
+    return groups
+
+
+def mirror_motion(motion):
+    """
+    Mirror image of a result with respect to the x axis
+
+    Parameters
+    ----------
+    motion : tuple
+        (x, y, yaw)
+
+    Returns
+    -------
+    tuple
+        (x, -y, -yaw)
+    """
+    x, y, yaw = motion
+    return x, -y, -yaw
+
+
+def transform_motion(motion, mirrored):
+    """
+    Result of a combination from the result of another combination of the same group
+
+    Parameters
+    ----------
+    motion : tuple
+        (x, y, yaw) of the other combination
+    mirrored : bool
+        True if the flags of the two combinations are different
+
+    Returns
+    -------
+    tuple
+        (x, y, yaw)
+    """
+    return mirror_motion(motion) if mirrored else tuple(motion)
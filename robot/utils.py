@@ -121,6 +121,118 @@ class Utils:
         else:
             return angle
 
+    # Method to compute the pich and roll angles for an array of ground planes (N, 3), same as angle2ground
+    def angles2ground(planes):
+        roll_norm = np.sqrt(np.matmul(planes[:, np.newaxis, 1:], planes[:, 1:, np.newaxis])[:, 0, 0])
+        pitch_norm = np.sqrt(np.matmul(planes[:, np.newaxis, 0::2], planes[:, 0::2, np.newaxis])[:, 0, 0])
+
+        roll = np.arccos(planes[:, 2] / roll_norm)
+        pitch = np.arccos(planes[:, 2] / pitch_norm)
+        roll[np.isnan(roll)] = 0.0
+        pitch[np.isnan(pitch)] = 0.0
+        return pitch * np.sign(planes[:, 0]), roll * np.sign(planes[:, 1])
+
+    # Method to correct an array of angles between -pi/2 and pi/2, same as angle_correction
+    def angles_correction(angles):
+        return np.where(
+            np.abs(angles) > Utils.HALF_PI,
+            np.sign(angles) * ((np.abs(angles) % Utils.PI) - Utils.PI),
+            angles
+        )
+
+    # Method to compute the touching legs, pitch and roll for several positions of the 4 legs at once
+    def legs_orientation(legs_c, offsets):
+        """
+        Same passes as Robot.update_orientation, done for an array of leg positions (all the steps
+        of a robot or all the robots of a batch). The operations are the same as in the step by step
+        version so the results are exactly the same. np.dot and np.linalg.norm of 2D vectors are done
+        with np.matmul which gives the same numbers.
+
+        Parameters
+        ----------
+        legs_c : numpy Array
+            (N, 4, 3) Point C of the joints J1, J2, J3 and J4 in their reference frame
+        offsets : numpy Array
+            (4, 3) or (N, 4, 3) Structure offsets of the joints
+
+        Returns
+        -------
+        numpy Array
+            (N, 4) True for the touching legs
+        numpy Array
+            (N,) Pitch
+        numpy Array
+            (N,) Roll
+        """
+        rows = np.arange(len(legs_c))
+        legs_z = legs_c[:, :, 2]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # First pass, the highest legs
+            touching = legs_z == np.max(legs_z, axis=1, keepdims=True)
+            nb_touching_legs = np.sum(touching, axis=1)
+
+            # Only 1 leg, add the next highest legs. If it is the 3 others, keep only the diagonal one
+            one = nb_touching_legs == 1
+            ground2 = np.max(np.where(touching, -np.inf, legs_z), axis=1, keepdims=True)
+            second = (legs_z == ground2) & one[:, np.newaxis]
+            diagonal = touching[:, ::-1] & one[:, np.newaxis]
+            second = np.where((np.sum(second, axis=1) == 3)[:, np.newaxis], diagonal, second)
+            touching = touching | second
+            nb_touching_legs = np.sum(touching, axis=1)
+
+            # 2 legs not in diagonal, add the next highest legs
+            two = nb_touching_legs == 2
+            diag = two & (touching[:, 0] == touching[:, 3])
+            ground3 = np.max(np.where(touching, -np.inf, legs_z), axis=1, keepdims=True)
+            third = (legs_z == ground3) & (two & ~diag)[:, np.newaxis]
+            touching = touching | third
+
+            legs = legs_c + offsets
+
+            # 2 legs in diagonal (1-4 or 2-3)
+            first = np.where(touching[:, 0], 0, 1)
+            v = legs[rows, first] - legs[rows, 3 - first]
+            v_pnorm = np.sqrt(np.matmul(v[:, np.newaxis, 0::2], v[:, 0::2, np.newaxis])[:, 0, 0])
+            v_rnorm = np.sqrt(np.matmul(v[:, np.newaxis, 1:], v[:, 1:, np.newaxis])[:, 0, 0])
+            diag_pitch = np.arccos(v[:, 0] / v_pnorm) * np.sign(-v[:, 2])
+            diag_roll = np.arccos(v[:, 1] / v_rnorm) * np.sign(-v[:, 2])
+
+            # 3 or 4 legs, plane of the 3 first touching legs
+            index = np.argsort(~touching, axis=1, kind='stable')[:, :3]
+            sub_legs = legs[rows[:, np.newaxis], index]
+            v1 = sub_legs[:, 1] - sub_legs[:, 0]
+            v2 = sub_legs[:, 2] - sub_legs[:, 0]
+            plane_pitch, plane_roll = Utils.angles2ground(np.cross(v1, v2))
+
+            a_pitch = np.where(diag, diag_pitch, plane_pitch)
+            a_roll = np.where(diag, diag_roll, plane_roll)
+
+            # Need to place the angles inside -pi/2 -> pi/2
+            return touching, Utils.angles_correction(a_pitch), Utils.angles_correction(a_roll)
+
+    # Method to sum the values of the touching legs (Robot.update_attitude and BatchSimulation.update_attitude)
+    def sum_legs(values, touching):
+        """
+        Sum the values of the touching legs, the others count as 0. The legs are added by mirror pairs,
+        (J1 + J3) + (J2 + J4), so the mirror image of the robot (J1/J3 and J2/J4 exchanged, see symmetry.py)
+        gives exactly the same sum, or exactly its opposite for the values that change sign.
+
+        Parameters
+        ----------
+        values : numpy Array
+            (..., 4) Values for the legs J1, J2, J3 and J4
+        touching : numpy Array
+            (..., 4) True for the touching legs
+
+        Returns
+        -------
+        numpy Array
+            (...) Sum of the touching legs
+        """
+        values = np.where(touching, values, 0.0)
+        return (values[..., 0] + values[..., 2]) + (values[..., 1] + values[..., 3])
+
     def dict_merge(dct, merge_dct):
         """ Recursive dict merge. Inspired by :meth:``dict.update()``, instead of
         updating only top-level keys, dict_merge recurses down into dicts nested